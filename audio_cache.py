@@ -0,0 +1,121 @@
+import os
+import uuid
+import hashlib
+import threading
+
+
+class AudioCache:
+    """
+    Content-addressed store for synthesized Sankalpam MP3s.
+
+    Files are named by a SHA-256 of (Devanagari text, voice), so the same text spoken by
+    the same voice is synthesized once and served to every later request. When the
+    directory grows past max_bytes, least recently used files are removed first
+    (a hit refreshes the file's mtime).
+
+    Configuration (environment):
+        SANKALPAM_AUDIO_CACHE_DIR: Directory for cached MP3s (default: audio_cache).
+        SANKALPAM_AUDIO_CACHE_MAX_BYTES: Size limit for the directory (default: 200 MB).
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.getenv("SANKALPAM_AUDIO_CACHE_DIR", "audio_cache")
+        self.max_bytes = max_bytes or int(os.getenv("SANKALPAM_AUDIO_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice):
+        return hashlib.sha256(f"{voice}\n{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"sankalpam_{key}.mp3")
+
+    def get(self, text, voice):
+        """Returns the cached file path for (text, voice), or None on a miss."""
+        path = self.path_for(self.key(text, voice))
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def temp_path(self):
+        """A unique path in the cache directory to synthesize into before commit()."""
+        return os.path.join(self.directory, f".tmp_{uuid.uuid4().hex}.mp3")
+
+    def commit(self, temp_path, text, voice):
+        """
+        Atomically moves a finished file into the cache and enforces the size limit.
+
+        Returns:
+            str: The cached file path.
+        """
+        path = self.path_for(self.key(text, voice))
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def put_bytes(self, data, text, voice):
+        """Stores already-synthesized audio (e.g. from the shared cache) and returns its path."""
+        temp_path = self.temp_path()
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            return self.commit(temp_path, text, voice)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self):
+        """Removes least recently used files until the directory fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not (entry.name.startswith("sankalpam_") and entry.name.endswith(".mp3")):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    self.evictions += 1
+                except OSError:
+                    pass # Ignore errors during cleanup
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_audio_cache = None
+
+
+def get_audio_cache():
+    """Returns the process-wide AudioCache (created on first use)."""
+    global _audio_cache
+    if _audio_cache is None:
+        _audio_cache = AudioCache()
+    return _audio_cache
@@ -0,0 +1,116 @@
+import os
+import threading
+
+import numpy as np
+
+# Ayanamsa systems: (reference Julian date, mean ayanamsa in degrees at that date).
+# The value at any other date follows from the general precession in longitude.
+AYANAMSA_SYSTEMS = {
+    # Lahiri (Chitrapaksha), as adopted by the Indian Calendar Reform Committee:
+    # 23°15′00.658″ on 1956-03-21
+    "lahiri": (2435553.5, 23.245524743),
+    # B. V. Raman and Krishnamurti Paddhati, both referred to 1900-01-00.5
+    "raman": (2415020.0, 21.01444),
+    "kp": (2415020.0, 22.363889),
+}
+DEFAULT_SYSTEM = os.getenv("PANCHANGA_AYANAMSA", "lahiri").strip().lower()
+# Checked here: a typo would otherwise only surface inside the local calculation, which
+# turns errors into missing results
+if DEFAULT_SYSTEM not in AYANAMSA_SYSTEMS:
+    raise ValueError(f"Unknown PANCHANGA_AYANAMSA {DEFAULT_SYSTEM!r}; use one of {', '.join(AYANAMSA_SYSTEMS)}")
+
+# Table coverage: 1900-01-01 to 2100-12-31 at one entry per day
+TABLE_START_JD = 2415020.5
+TABLE_END_JD = 2488434.5
+
+J2000 = 2451545.0
+
+
+def _precession_arcsec(t):
+    """General precession in longitude p_A (IAU 2006) for t Julian centuries from J2000."""
+    return t * (5028.796195 + t * (1.1054348 + t * (0.00007964 + t * (-0.000023857 - t * 0.0000000383))))
+
+
+def _nutation_longitude_degrees(t):
+    """Nutation in longitude from its four largest terms (good to ~0.5″)."""
+    omega = np.radians(125.04452 - 1934.136261 * t)   # Moon's ascending node
+    sun = np.radians(280.4665 + 36000.7698 * t)       # Sun's mean longitude
+    moon = np.radians(218.3165 + 481267.8813 * t)     # Moon's mean longitude
+    arcsec = (-17.20 * np.sin(omega) - 1.32 * np.sin(2 * sun)
+              - 0.23 * np.sin(2 * moon) + 0.21 * np.sin(2 * omega))
+    return arcsec / 3600.0
+
+
+def compute_ayanamsa(julian_date, system=DEFAULT_SYSTEM):
+    """
+    True ayanamsa (degrees) for a Julian date, straight from the model.
+
+    The mean ayanamsa is the system's reference value carried forward by precession;
+    nutation is added so it pairs with apparent (true-of-date) longitudes.
+    Works on scalars and NumPy arrays.
+
+    Raises:
+        ValueError: If system is not one of AYANAMSA_SYSTEMS.
+    """
+    try:
+        reference_jd, reference_value = AYANAMSA_SYSTEMS[system]
+    except KeyError:
+        raise ValueError(f"Unknown ayanamsa system {system!r}; choose from {', '.join(AYANAMSA_SYSTEMS)}")
+
+    t = (np.asarray(julian_date, dtype=float) - J2000) / 36525.0
+    t0 = (reference_jd - J2000) / 36525.0
+    mean = reference_value + (_precession_arcsec(t) - _precession_arcsec(t0)) / 3600.0
+    return mean + _nutation_longitude_degrees(t)
+
+
+class AyanamsaTable:
+    """
+    Day-resolution ayanamsa table for 1900-2100 with linear interpolation.
+
+    Ayanamsa changes by ~0.04″ a day (nutation included), so interpolating between
+    daily entries is exact to a few milliarcseconds. Dates outside the table
+    fall back to compute_ayanamsa.
+    """
+
+    def __init__(self, system=DEFAULT_SYSTEM):
+        self.system = system
+        days = np.arange(TABLE_START_JD, TABLE_END_JD + 1.0)
+        self.values = compute_ayanamsa(days, system)
+        # Plain floats make the scalar lookup a list index instead of a NumPy call
+        self._list = self.values.tolist()
+        self._last = len(self._list) - 1
+
+    def lookup(self, julian_date):
+        """Interpolated ayanamsa in degrees (scalar or NumPy array)."""
+        if isinstance(julian_date, np.ndarray):
+            offset = julian_date - TABLE_START_JD
+            inside = (offset >= 0) & (offset <= self._last)
+            if inside.all():
+                return np.interp(offset, np.arange(self._last + 1), self.values)
+            return np.where(
+                inside,
+                np.interp(offset, np.arange(self._last + 1), self.values),
+                compute_ayanamsa(julian_date, self.system),
+            )
+
+        offset = julian_date - TABLE_START_JD
+        if not 0 <= offset < self._last:
+            return float(compute_ayanamsa(julian_date, self.system))
+        index = int(offset)
+        low = self._list[index]
+        return low + (self._list[index + 1] - low) * (offset - index)
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_ayanamsa_table(system=DEFAULT_SYSTEM):
+    """Returns the AyanamsaTable for system (built on first use, ~10 ms)."""
+    table = _tables.get(system)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(system)
+            if table is None:
+                table = _tables[system] = AyanamsaTable(system)
+    return table
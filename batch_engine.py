@@ -0,0 +1,149 @@
+"""
+Vectorized Panchanga engine for many (latitude, longitude, timezone, date) inputs.
+
+Only the ephemeris lookups (sunrise search, Sun/Moon positions) run per element via
+ephemeris.sunrise_ecliptic_longitudes; the Tithi/Paksha/Nakshatra/Masa math runs
+as NumPy array operations, matching get_accurate_panchanga_local element for element.
+
+Example:
+    from batch_engine import compute_panchanga_indexes, indexes_to_names
+
+    result = compute_panchanga_indexes(
+        latitudes=[33.1507, 19.0760],
+        longitudes=[-96.8236, 72.8777],
+        timezones=[-6.0, 5.5],
+        dates=["2025-12-23", "2025-12-23"],
+    )
+    names = indexes_to_names(result)
+"""
+from datetime import date
+
+import numpy as np
+
+from ephemeris import sunrise_ecliptic_longitudes, ayanamsa_degrees
+from panchanga_tool import NAKSHATRA_NAMES, MASA_NAMES, PAKSHA_NAMES, tithi_name_and_paksha
+
+# Lookup tables indexed by the tithi number from the elongation (0-30)
+_TITHI_NAME_TABLE = np.array([tithi_name_and_paksha(n)[0] for n in range(31)], dtype=object)
+_NAKSHATRA_NAME_TABLE = np.array(NAKSHATRA_NAMES, dtype=object)
+_MASA_NAME_TABLE = np.array(MASA_NAMES, dtype=object)
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]").item()
+    return date.fromisoformat(str(value))
+
+
+def ephemeris_arrays(latitudes, longitudes, timezones, dates):
+    """
+    Runs the per-element ephemeris lookups.
+
+    Scalars are broadcast against arrays, so one location can be paired with many dates
+    (or one date with many locations).
+
+    Returns:
+        tuple: (julian_date, sun_longitude, moon_longitude, valid) arrays; longitudes in
+               radians, NaN where the lookup failed (valid is False there).
+    """
+    lat, lon, tz, dts = np.broadcast_arrays(
+        np.asarray(latitudes, dtype=float),
+        np.asarray(longitudes, dtype=float),
+        np.asarray(timezones, dtype=float),
+        np.asarray(dates, dtype=object),
+    )
+    n = lat.size
+    jd = np.full(n, np.nan)
+    sun_lon = np.full(n, np.nan)
+    moon_lon = np.full(n, np.nan)
+
+    for i, (la, lo, t, d) in enumerate(zip(lat.ravel(), lon.ravel(), tz.ravel(), dts.ravel())):
+        try:
+            d = _to_date(d)
+            jd[i], sun_lon[i], moon_lon[i], _ = sunrise_ecliptic_longitudes(la, lo, t, d.year, d.month, d.day)
+        except Exception as e:
+            print(f"Error in batch ephemeris lookup at index {i}: {e}")
+
+    return jd, sun_lon, moon_lon, ~np.isnan(jd)
+
+
+def panchanga_indexes_from_longitudes(jd, sun_lon, moon_lon):
+    """
+    Array version of the Tithi/Nakshatra/Masa math in get_accurate_panchanga_local.
+
+    Returns:
+        dict: int arrays "tithi" (0-30, as from the elongation), "paksha" (0 = Śukla, 1 = Kṛṣṇa),
+              "nakshatra" (1-27) and "masa" (0-11, index into MASA_NAMES); -1 where input is NaN.
+    """
+    two_pi = 2 * np.pi
+    valid = ~(np.isnan(jd) | np.isnan(sun_lon) | np.isnan(moon_lon))
+    jd = np.where(valid, jd, 2451545.0)
+    sun_lon = np.where(valid, sun_lon, 0.0)
+    moon_lon = np.where(valid, moon_lon, 0.0)
+
+    # ayanamsa_degrees is plain arithmetic, so it evaluates element-wise on arrays
+    ayanamsa_rad = np.radians(ayanamsa_degrees(jd))
+
+    # 1. Tithi (Independent of Ayanamsa)
+    diff = np.mod(moon_lon - sun_lon, two_pi)
+    tithi = np.ceil(np.degrees(diff) / 12.0).astype(int)
+    paksha = (tithi > 15).astype(int)
+
+    # 2. Nakshatra (Nirayana Moon)
+    nirayana_moon = np.mod(moon_lon - ayanamsa_rad, two_pi)
+    nakshatra = np.ceil(np.degrees(nirayana_moon) * 27 / 360.0).astype(int)
+    nakshatra[nakshatra == 0] = 27
+
+    # 3. Masa (Amanta, from the solar rashi of the Nirayana Sun)
+    nirayana_sun = np.mod(sun_lon - ayanamsa_rad, two_pi)
+    solar_rashi = (np.degrees(nirayana_sun) / 30.0).astype(int)
+    masa = (solar_rashi + 1) % 12
+
+    invalid = ~valid
+    for arr in (tithi, paksha, nakshatra, masa):
+        arr[invalid] = -1
+
+    return {"tithi": tithi, "paksha": paksha, "nakshatra": nakshatra, "masa": masa}
+
+
+def compute_panchanga_indexes(latitudes, longitudes, timezones, dates):
+    """
+    Computes Tithi/Paksha/Nakshatra/Masa indexes for many locations and dates.
+
+    Args:
+        latitudes, longitudes, timezones: Floats or array-likes (broadcast together).
+        dates: date objects, numpy datetime64 values or YYYY-MM-DD strings.
+
+    Returns:
+        dict: The arrays from panchanga_indexes_from_longitudes plus "valid" (bool).
+    """
+    jd, sun_lon, moon_lon, valid = ephemeris_arrays(latitudes, longitudes, timezones, dates)
+    result = panchanga_indexes_from_longitudes(jd, sun_lon, moon_lon)
+    result["valid"] = valid
+    return result
+
+
+def indexes_to_names(result):
+    """
+    Converts index arrays into a list of dicts shaped like get_accurate_panchanga_local
+    results (None where the element failed).
+    """
+    valid = result["valid"]
+    tithi = _TITHI_NAME_TABLE[np.where(valid, result["tithi"], 0)]
+    nakshatra = _NAKSHATRA_NAME_TABLE[np.where(valid, result["nakshatra"] - 1, 0)]
+    masa = _MASA_NAME_TABLE[np.where(valid, result["masa"], 0)]
+
+    names = []
+    for i in range(valid.size):
+        if not valid[i]:
+            names.append(None)
+            continue
+        names.append({
+            "tithi": tithi[i],
+            "paksha": PAKSHA_NAMES[result["paksha"][i]],
+            "nakshatra": nakshatra[i],
+            "masa": masa[i],
+        })
+    return names
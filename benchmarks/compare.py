@@ -0,0 +1,67 @@
+"""
+Compares two benchmark result files from benchmarks.run.
+
+Usage:
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 0.2]
+
+Prints throughput and p50/p99 changes per (target, mode, concurrency) and exits with
+status 1 if any candidate p99 is more than `threshold` (fraction) slower than the baseline.
+"""
+import sys
+import json
+import argparse
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    rows = {(r["target"], r["mode"], r["concurrency"]): r for r in report["results"]}
+    return report.get("meta", {}), rows
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p99 slowdown (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    base_meta, base = load(args.baseline)
+    cand_meta, cand = load(args.candidate)
+    print(f"baseline  {base_meta.get('commit', '?')}  {args.baseline}")
+    print(f"candidate {cand_meta.get('commit', '?')}  {args.candidate}\n")
+    print(f"{'target':16} {'mode':4} {'c':>3}  {'req/s':>15}  {'p50 ms':>19}  {'p99 ms':>19}")
+
+    regressions = []
+    for key in sorted(set(base) & set(cand)):
+        old, new = base[key], cand[key]
+        p99_change = change(old["p99_ms"], new["p99_ms"])
+        flag = ""
+        if p99_change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        target, mode, concurrency = key
+        print(
+            f"{target:16} {mode:4} {concurrency:>3}  "
+            f"{new['throughput_rps']:8.1f} {change(old['throughput_rps'], new['throughput_rps']):+6.0%}  "
+            f"{new['p50_ms']:10.2f} {change(old['p50_ms'], new['p50_ms']):+7.0%}  "
+            f"{new['p99_ms']:10.2f} {p99_change:+7.0%}{flag}"
+        )
+
+    missing = sorted(set(base) ^ set(cand))
+    if missing:
+        print(f"\n{len(missing)} result(s) only present in one file were skipped.")
+    if regressions:
+        print(f"\n{len(regressions)} p99 regression(s) above {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
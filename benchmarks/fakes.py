@@ -0,0 +1,192 @@
+"""
+Offline stand-ins for the services the MCP server talks to.
+
+- StubUpstream: an HTTP server shaped like the C# PanchangaController, with a
+  configurable response latency.
+- FakeCommunicate: an edge_tts.Communicate replacement (install it with
+  panchanga_tool.set_tts_factory) that returns canned (silent) MP3 frames after a delay.
+
+Used by the benchmarks (benchmarks/run.py) and the load tests (loadtest/).
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SANSKRIT_NAMES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sanskrit-names.json")
+
+# One MPEG-1 Layer III frame (128 kbit/s, 44.1 kHz, no CRC) of silence: 417 bytes, 26 ms
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+_names = None
+
+
+def _name(category, number):
+    # The names the C# API returns (loaded once; the stub must not depend on the server's modules)
+    global _names
+    if _names is None:
+        with open(SANSKRIT_NAMES_PATH, "r", encoding="utf-8") as f:
+            _names = json.load(f)
+    return _names[category].get(str(number), "")
+
+
+def _dms(hours):
+    hours %= 24
+    degrees = int(hours)
+    minutes = int((hours - degrees) * 60)
+    seconds = int(round(((hours - degrees) * 60 - minutes) * 60)) % 60
+    return {"degrees": degrees, "minutes": minutes, "seconds": seconds}
+
+
+def stub_panchanga_response(params):
+    """
+    A PanchangaData shaped like the C# models for the query.
+
+    Elements are derived from the date (not computed astronomically), so different dates
+    give different names, end times and occasional skipped elements, like real
+    responses; the same query always gives the same answer.
+    """
+    def arg(name, cast, default):
+        try:
+            return cast(params[name][0])
+        except (KeyError, IndexError, ValueError):
+            return default
+
+    year, month, day = arg("year", int, 2025), arg("month", int, 1), arg("day", int, 1)
+    try:
+        ordinal = date(year, month, day).toordinal()
+    except ValueError:
+        ordinal = 0
+    latitude = arg("latitude", float, 0.0)
+    # A tithi lasts ~0.95 days, so every ~60th day skips one (kṣaya)
+    tithi = ordinal * 30 // 29 % 30 + 1
+    nakshatra = ordinal * 27 // 27.3 % 27 + 1
+    yoga = ordinal * 27 // 25.4 % 27 + 1
+    masa = (ordinal // 30) % 12 + 1
+    season = (1 - abs(((ordinal % 365) - 172) / 183.0)) * (latitude / 90.0)  # -1 .. 1, summer in June (north)
+    sunrise = 6.2 - 1.4 * season
+    sunset = 18.1 + 1.4 * season
+    skipped = ordinal * 30 % 29 == 0
+
+    return {
+        "date": {"year": year, "month": month, "day": day, "isValid": True},
+        "location": {
+            "latitude": latitude,
+            "longitude": arg("longitude", float, 0.0),
+            "timezone": arg("timezone", float, 0.0),
+            "name": arg("locationName", str, "Unknown"),
+            "isValid": True
+        },
+        "tithi": {"number": tithi, "name": _name("tithis", tithi), "endTime": _dms(sunrise + 7 + ordinal % 17), "isSkipped": False},
+        "nakshatra": {"number": int(nakshatra), "name": _name("nakshatras", int(nakshatra)), "endTime": _dms(sunrise + 3 + ordinal % 19), "isSkipped": False},
+        "yoga": {"number": int(yoga), "name": _name("yogas", int(yoga)), "endTime": _dms(sunrise + 5 + ordinal % 13), "isSkipped": False},
+        "karana": {"number": (tithi * 2 - 1) % 60 + 1, "name": _name("karanas", (tithi * 2 - 1) % 60 + 1)},
+        "vara": {"number": ordinal % 7, "name": _name("varas", ordinal % 7)},  # 0 = Sunday
+        "masa": {"number": masa, "name": _name("masas", masa), "isLeapMonth": False},
+        "samvatsara": {"number": (year - 1987) % 60 + 1, "name": _name("samvats", (year - 1987) % 60 + 1)},
+        "ritu": {"number": (masa - 1) // 2, "name": _name("ritus", (masa - 1) // 2)},
+        "sunrise": _dms(sunrise),
+        "sunset": _dms(sunset),
+        "moonrise": _dms(sunrise + tithi * 0.8),
+        "moonset": _dms(sunset + tithi * 0.8),
+        "dayDurationHours": round(sunset - sunrise, 2),
+        "additionalTithi": (
+            {"number": tithi % 30 + 1, "name": _name("tithis", tithi % 30 + 1), "endTime": _dms(sunrise + 22), "isSkipped": True}
+            if skipped else None
+        ),
+        "additionalNakshatra": None,
+        "additionalYoga": None
+    }
+
+
+class StubUpstream:
+    """
+    Threaded HTTP server answering GET /api/panchanga like the C# API.
+
+    Args:
+        latency (float): Seconds to sleep before each response.
+        port (int): Port to bind on 127.0.0.1 (0 picks a free one).
+    """
+
+    def __init__(self, latency=0.0, port=0):
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, Nagle's algorithm
+            # plus delayed ACKs add ~40 ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = json.dumps(stub_panchanga_response(parse_qs(urlparse(self.path).query))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # The default listen backlog (5) drops SYNs when a benchmark opens many
+            # connections at once, adding 1 s retransmit stalls to the measurements
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/panchanga"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeCommunicate:
+    """
+    Drop-in for edge_tts.Communicate: waits `latency` seconds, then produces about `size`
+    bytes of silent MP3 frames in `chunks` pieces.
+    """
+
+    latency = 0.2
+    size = 48 * 1024
+    chunks = 8
+
+    def __init__(self, text, voice):
+        self.text = text
+        self.voice = voice
+
+    async def stream(self):
+        chunk = SILENT_MP3_FRAME * max(1, self.size // self.chunks // len(SILENT_MP3_FRAME))
+        for _ in range(self.chunks):
+            await asyncio.sleep(self.latency / self.chunks)
+            yield {"type": "audio", "data": chunk}
+
+    async def save(self, path):
+        with open(path, "wb") as f:
+            async for chunk in self.stream():
+                f.write(chunk["data"])
+
+
+def fake_tts_factory(latency=0.2, size=48 * 1024):
+    """Returns a FakeCommunicate subclass with the given latency (seconds) and payload size."""
+    return type("FakeCommunicate", (FakeCommunicate,), {"latency": latency, "size": size})
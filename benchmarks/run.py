@@ -0,0 +1,364 @@
+"""
+Benchmarks for the Panchanga, Sankalpam and voice paths.
+
+Runs fully offline: the C# API is replaced by benchmarks.fakes.StubUpstream and Edge TTS
+by FakeCommunicate. Each target is measured at several concurrency levels, in two modes:
+
+    cold  every request uses a new (location, date), so every cache misses
+    warm  every request repeats one (location, date) that was requested beforehand
+
+The startup target instead launches the stdio entry point (run_local.py) repeatedly and
+times its first reply, against STARTUP_TARGET_MS.
+
+Usage (from the repository root):
+    python -m benchmarks.run
+    python -m benchmarks.run --targets accurate_local,route_panchanga --concurrency 1,16 --requests 500
+    python -m benchmarks.run --targets startup --startup-runs 20
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Results are written as JSON (default: benchmarks/results/<UTC time>-<commit>.json).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import StubUpstream, fake_tts_factory
+
+TARGETS = (
+    "accurate_local", "get_panchanga", "get_sankalpam",
+    "route_panchanga", "route_sankalpam", "route_voice",
+    "startup",
+)
+MODES = ("cold", "warm")
+
+# Budget for the stdio entry point: launch of run_local.py until its reply to the MCP
+# `initialize` request (IDE clients start one per session)
+STARTUP_TARGET_MS = float(os.getenv("PANCHANGA_STARTUP_TARGET_MS", "1500"))
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Locations cycled through in cold mode (name, latitude, longitude, timezone)
+LOCATIONS = [
+    ("Frisco, TX", 33.1507, -96.8236, -6.0),
+    ("Mumbai, India", 19.0760, 72.8777, 5.5),
+    ("London, UK", 51.5074, -0.1278, 0.0),
+    ("Sydney, Australia", -33.8688, 151.2093, 11.0),
+]
+WARM_ITEM = ("Frisco, TX", 33.1507, -96.8236, -6.0, date(2025, 12, 23))
+COLD_START = date(1950, 1, 1)
+
+API_KEY = os.getenv("MCP_API_KEY", "panchanga-secret-key")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round((count + errors) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+class ItemSource:
+    """Hands out (name, lat, lon, tz, date) items; cold items never repeat within a process."""
+
+    def __init__(self):
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def item(self, mode):
+        if mode == "warm":
+            return WARM_ITEM
+        with self._lock:
+            i = self._next
+            self._next += 1
+        name, lat, lon, tz = LOCATIONS[i % len(LOCATIONS)]
+        return name, lat, lon, tz, COLD_START + timedelta(days=i // len(LOCATIONS))
+
+
+def _is_error(result):
+    return isinstance(result, dict) and "error" in result
+
+
+def run_sync(fn, items, concurrency, total):
+    """Calls fn(item) `total` times from `concurrency` threads."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(_):
+        item = items()
+        start = time.perf_counter()
+        try:
+            failed = _is_error(fn(item))
+        except Exception:
+            failed = True
+        duration = time.perf_counter() - start
+        with lock:
+            if failed:
+                errors[0] += 1
+            else:
+                latencies.append(duration)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+async def run_async(fn, items, concurrency, total):
+    """Runs `total` calls of the coroutine fn(item) with `concurrency` in flight."""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            item = items()
+            start = time.perf_counter()
+            try:
+                failed = await fn(item)
+            except Exception:
+                failed = True
+            duration = time.perf_counter() - start
+            if failed:
+                errors += 1
+            else:
+                latencies.append(duration)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def _route_params(item):
+    name, lat, lon, tz, d = item
+    return {
+        "latitude": lat, "longitude": lon, "timezone": tz,
+        "year": d.year, "month": d.month, "day": d.day, "location_name": name,
+    }
+
+
+def sync_target(name):
+    """The blocking function measured by a sync target, taking one item."""
+    import panchanga_tool
+
+    if name == "accurate_local":
+        return lambda item: panchanga_tool.get_accurate_panchanga_local(item[1], item[2], item[3], item[4].year, item[4].month, item[4].day)
+    if name == "get_panchanga":
+        return lambda item: panchanga_tool.get_panchanga(item[1], item[2], item[3], item[4].year, item[4].month, item[4].day, item[0])
+    if name == "get_sankalpam":
+        return lambda item: panchanga_tool.get_sankalpam(item[1], item[2], item[3], item[4].year, item[4].month, item[4].day, item[0])
+    raise ValueError(f"Unknown target {name}")
+
+
+ROUTES = {
+    "route_panchanga": "/api/panchanga",
+    "route_sankalpam": "/api/sankalpam",
+    "route_voice": "/api/voice",
+}
+
+
+async def run_route(name, mode, concurrency, total, source):
+    """Measures one REST route in-process over ASGI (no sockets, no uvicorn)."""
+    import httpx
+    import mcp_server
+
+    path = ROUTES[name]
+    transport = httpx.ASGITransport(app=mcp_server.secure_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"X-API-Key": API_KEY}, timeout=120) as client:
+        async def call(item):
+            response = await client.get(path, params=_route_params(item))
+            return response.status_code != 200 or _is_error(response.json())
+
+        if mode == "warm":
+            await call(source.item("warm"))
+        return await run_async(call, lambda: source.item(mode), concurrency, total)
+
+
+def run_startup(runs):
+    """
+    Launches `python run_local.py` `runs` times, one after another, and measures the time
+    until it answers an MCP initialize request on stdout.
+    """
+    request = json.dumps({
+        "jsonrpc": "2.0", "id": 1, "method": "initialize",
+        "params": {"protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "benchmark", "version": "1"}},
+    }) + "\n"
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "run_local.py")], cwd=REPO_ROOT,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        try:
+            # Written before the server is up; it is read once the stdio transport starts
+            process.stdin.write(request)
+            process.stdin.flush()
+            reply = process.stdout.readline()
+            duration = time.perf_counter() - start
+            if '"result"' in reply:
+                latencies.append(duration)
+            else:
+                errors += 1
+        finally:
+            process.kill()
+            process.wait()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_target(name, mode, concurrency, total, source):
+    if name == "startup":
+        return run_startup(total)
+    if name in ROUTES:
+        return asyncio.run(run_route(name, mode, concurrency, total, source))
+
+    fn = sync_target(name)
+    if mode == "warm":
+        fn(source.item("warm"))
+    return run_sync(fn, lambda: source.item(mode), concurrency, total)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Panchanga MCP server.")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Comma-separated subset of: {', '.join(TARGETS)}")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of: cold, warm")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per (target, mode, concurrency)")
+    parser.add_argument("--startup-runs", type=int, default=10, help="Process launches measured by the startup target")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="Stub upstream response delay")
+    parser.add_argument("--tts-latency-ms", type=float, default=200.0, help="Fake TTS synthesis time")
+    parser.add_argument("--executor", default=os.getenv("PANCHANGA_EXECUTOR", "process"), help="PANCHANGA_EXECUTOR mode for the run")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<UTC time>-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    targets = [t for t in args.targets.split(",") if t]
+    modes = [m for m in args.modes.split(",") if m]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    for t in targets:
+        if t not in TARGETS:
+            sys.exit(f"Unknown target {t}; choose from {', '.join(TARGETS)}")
+
+    upstream = StubUpstream(latency=args.upstream_latency_ms / 1000.0).start()
+    audio_dir = tempfile.TemporaryDirectory(prefix="bench_audio_")
+
+    # Configure the server before its modules read the environment
+    os.environ["PANCHANGAM_API_URL"] = upstream.url
+    os.environ["SANKALPAM_AUDIO_CACHE_DIR"] = audio_dir.name
+    os.environ["PANCHANGA_EXECUTOR"] = args.executor
+    os.environ.setdefault("MCP_API_KEY", API_KEY)
+
+    import panchanga_tool
+    from executor import get_executor
+
+    # Per-request client logging would dominate the output (and the timings)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    panchanga_tool.set_tts_factory(fake_tts_factory(latency=args.tts_latency_ms / 1000.0))
+
+    results = []
+    try:
+        source = ItemSource()
+        # One untimed call per target starts worker processes, connection pools and the
+        # warm item's cache entries, so the first measured run does not pay for them
+        for target in targets:
+            run_target(target, "warm", 1, 1, source)
+
+        for target in targets:
+            if target == "startup":
+                # Every launch is a cold process; modes and concurrency don't apply
+                summary = run_target(target, "cold", 1, args.startup_runs, source)
+                row = {"target": target, "mode": "cold", "concurrency": 1, "target_ms": STARTUP_TARGET_MS, **summary}
+                results.append(row)
+                verdict = "within" if row["errors"] == 0 and row["p50_ms"] <= STARTUP_TARGET_MS else "OVER"
+                print(
+                    f"{target:16} cold c=1   p50 {row['p50_ms']:8.2f} ms  p99 {row['p99_ms']:8.2f} ms  "
+                    f"errors {row['errors']}  ({verdict} the {STARTUP_TARGET_MS:.0f} ms target)"
+                )
+                continue
+            for mode in modes:
+                for concurrency in levels:
+                    summary = run_target(target, mode, concurrency, args.requests, source)
+                    row = {"target": target, "mode": mode, "concurrency": concurrency, **summary}
+                    results.append(row)
+                    print(
+                        f"{target:16} {mode:4} c={concurrency:<3} "
+                        f"{row['throughput_rps']:9.1f} req/s  p50 {row['p50_ms']:8.2f} ms  "
+                        f"p99 {row['p99_ms']:8.2f} ms  errors {row['errors']}"
+                    )
+    finally:
+        get_executor().shutdown()
+        upstream.stop()
+        audio_dir.cleanup()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "executor": args.executor,
+            "requests": args.requests,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "tts_latency_ms": args.tts_latency_ms,
+            "startup_target_ms": STARTUP_TARGET_MS,
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if not output:
+        stamp = datetime.now(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{stamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+# Prefix for every key this service writes, so a shared Redis can host other data too
+KEY_PREFIX = os.getenv("PANCHANGA_CACHE_PREFIX", "panchanga:")
+
+# Default lifetime of cached results and audio (seconds)
+DEFAULT_TTL = int(os.getenv("PANCHANGA_SHARED_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Single-flight: how long a compute lock is held at most, and how long other callers
+# wait for the holder's result before computing it themselves
+LOCK_TTL = float(os.getenv("PANCHANGA_CACHE_LOCK_TTL", "30"))
+LOCK_WAIT = float(os.getenv("PANCHANGA_CACHE_LOCK_WAIT", "15"))
+
+
+class CacheBackend(ABC):
+    """
+    Byte-oriented key/value cache shared by every replica, with expiring locks.
+
+    Implementations store opaque bytes; callers serialize (JSON for results, raw MP3
+    for audio). All methods are coroutines so network backends don't block the loop.
+    Subclasses must implement every abstract method; a missing one fails at construction.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.lock_waits = 0
+        self.errors = 0
+
+    async def get(self, key):
+        """Returns the bytes stored under key, or None."""
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @abstractmethod
+    async def _get(self, key):
+        """Returns the bytes stored under key, or None, without counting a hit or miss."""
+        # Uncounted read; get_or_compute polls with it so waiting doesn't skew the hit ratio
+
+    @abstractmethod
+    async def set(self, key, value, ttl=DEFAULT_TTL):
+        """Stores value (bytes) under key for ttl seconds."""
+
+    @abstractmethod
+    async def delete(self, key):
+        """Removes key if present."""
+
+    @abstractmethod
+    async def acquire_lock(self, key, ttl=LOCK_TTL):
+        """Returns a token if the lock was taken, else None."""
+
+    @abstractmethod
+    async def release_lock(self, key, token):
+        """Releases the lock only if it is still held with token."""
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "sets": self.sets,
+            "lock_waits": self.lock_waits,
+            "errors": self.errors,
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process stand-in for Redis (single replica, development, tests).
+
+    Bounded by total stored bytes; least recently used entries are evicted first.
+
+    Configuration (environment):
+        PANCHANGA_MEMORY_CACHE_MAX_BYTES: Size limit (default: 64 MB).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes=None):
+        super().__init__()
+        self.max_bytes = max_bytes or int(os.getenv("PANCHANGA_MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._data = OrderedDict()  # key -> (expires_at, bytes)
+        self._locks = {}            # key -> (expires_at, token)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    async def _get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= now:
+                self._bytes -= len(entry[1])
+                del self._data[key]
+                entry = None
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key, value, ttl=DEFAULT_TTL):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            self.sets += 1
+            while self._bytes > self.max_bytes and self._data:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    async def delete(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+
+    async def acquire_lock(self, key, ttl=LOCK_TTL):
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[0] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (now + ttl, token)
+            return token
+
+    async def release_lock(self, key, token):
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] == token:
+                del self._locks[key]
+
+    def stats(self):
+        return {**super().stats(), "entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+# Deletes the lock only if it still holds our token (another holder may own it after expiry)
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis (or any Redis-protocol server: KeyDB, Valkey, Dragonfly) shared by all replicas.
+
+    Requires the optional `redis` package (pip install redis). Locks use SET NX PX and a
+    compare-and-delete script, so an expired lock cannot be released by its old holder.
+
+    Configuration (environment):
+        PANCHANGA_REDIS_URL: Connection URL (default: redis://localhost:6379/0).
+    """
+
+    name = "redis"
+
+    def __init__(self, url=None):
+        super().__init__()
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("PANCHANGA_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis_asyncio
+        self.url = url or os.getenv("PANCHANGA_REDIS_URL", "redis://localhost:6379/0")
+        self._client = None
+        self._loop = None
+
+    def _get_client(self):
+        # Like the upstream client, a connection pool belongs to one event loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = self._redis.Redis.from_url(self.url)
+            self._loop = loop
+        return self._client
+
+    async def _get(self, key):
+        try:
+            return await self._get_client().get(key)
+        except Exception as e:
+            # A cache outage degrades to computing; it never fails the request
+            print(f"Redis get failed: {e}")
+            self.errors += 1
+            return None
+
+    async def set(self, key, value, ttl=DEFAULT_TTL):
+        try:
+            await self._get_client().set(key, value, ex=max(1, int(ttl)))
+            self.sets += 1
+        except Exception as e:
+            print(f"Redis set failed: {e}")
+            self.errors += 1
+
+    async def delete(self, key):
+        try:
+            await self._get_client().delete(key)
+        except Exception as e:
+            print(f"Redis delete failed: {e}")
+            self.errors += 1
+
+    async def acquire_lock(self, key, ttl=LOCK_TTL):
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._get_client().set(key, token, nx=True, px=int(ttl * 1000))
+        except Exception as e:
+            print(f"Redis lock failed: {e}")
+            self.errors += 1
+            # Without Redis there is nobody to coordinate with; compute locally
+            return token
+        return token if acquired else None
+
+    async def release_lock(self, key, token):
+        try:
+            await self._get_client().eval(_RELEASE_SCRIPT, 1, key, token)
+        except Exception as e:
+            print(f"Redis unlock failed: {e}")
+            self.errors += 1
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def stats(self):
+        return {**super().stats(), "url": self.url.split("@")[-1]}
+
+
+def shared_key(name):
+    """Full backend key for a logical key like "audio:<hash>"."""
+    return KEY_PREFIX + name
+
+
+async def get_or_compute(backend, key, compute, encode, decode, ttl=DEFAULT_TTL):
+    """
+    Returns the cached value for key, computing it at most once across replicas.
+
+    The first caller to miss takes a lock and computes; concurrent callers (on any
+    replica) poll for its result. If the holder does not finish within
+    PANCHANGA_CACHE_LOCK_WAIT, waiters compute for themselves rather than fail.
+
+    Args:
+        compute: Coroutine function producing the value.
+        encode: value -> bytes to store, or None to skip storing (e.g. error results).
+        decode: bytes -> value.
+    """
+    key = shared_key(key)
+    cached = await backend.get(key)
+    if cached is not None:
+        return decode(cached)
+
+    lock_key = key + ":lock"
+    token = await backend.acquire_lock(lock_key)
+    if token is None:
+        backend.lock_waits += 1
+        deadline = time.monotonic() + LOCK_WAIT
+        delay = 0.02
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            cached = await backend._get(key)
+            if cached is not None:
+                backend.hits += 1
+                return decode(cached)
+            # The holder finished without storing (e.g. an error) or its lock expired
+            token = await backend.acquire_lock(lock_key)
+            if token is not None:
+                break
+        if token is not None:
+            # The value may have landed between our last read and taking the lock
+            cached = await backend._get(key)
+            if cached is not None:
+                backend.hits += 1
+                await backend.release_lock(lock_key, token)
+                return decode(cached)
+
+    try:
+        value = await compute()
+        blob = encode(value)
+        if blob is not None:
+            await backend.set(key, blob, ttl)
+        return value
+    finally:
+        if token is not None:
+            await backend.release_lock(lock_key, token)
+
+
+_backend = None
+
+
+def get_cache_backend():
+    """
+    Returns the process-wide CacheBackend selected by PANCHANGA_CACHE_BACKEND
+    ("memory", the default, or "redis").
+    """
+    global _backend
+    if _backend is None:
+        kind = os.getenv("PANCHANGA_CACHE_BACKEND", "memory").strip().lower()
+        if kind == "redis":
+            _backend = RedisBackend()
+        elif kind == "memory":
+            _backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown PANCHANGA_CACHE_BACKEND {kind!r}; use 'memory' or 'redis'")
+    return _backend
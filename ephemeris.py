@@ -0,0 +1,81 @@
+import ephem
+from datetime import datetime, timedelta
+
+from ayanamsa import DEFAULT_SYSTEM, get_ayanamsa_table
+from ephemeris_snapshot import get_snapshot
+from sunrise_grid import next_sunrise, SUNRISE_OK
+
+# Offset between Julian dates and ephem's Dublin Julian dates
+DUBLIN_JD_EPOCH = 2415020.0
+
+def make_observer(latitude, longitude):
+    observer = ephem.Observer()
+    observer.lat = str(latitude)
+    observer.lon = str(longitude)
+    return observer
+
+def julian_to_ephem_date(julian_date):
+    return ephem.Date(julian_date - DUBLIN_JD_EPOCH)
+
+def _ecliptic_of_date(body, epoch):
+    # Apparent geocentric RA/Dec (g_ra/g_dec) are of date; ephem.Ecliptic(body) would use
+    # the astrometric J2000 position, which lags the equinox of date by precession
+    equatorial = ephem.Equatorial(body.g_ra, body.g_dec, epoch=epoch)
+    return ephem.Ecliptic(equatorial, epoch=epoch).lon
+
+def ecliptic_longitudes(observer):
+    """
+    Sun and Moon ecliptic longitudes (radians) for the observer's date.
+
+    Geocentric, apparent and referred to the equinox of date, which is the frame the
+    ayanamsa is measured in (Nirayana longitude = returned longitude - ayanamsa).
+    Interpolated from the memory-mapped snapshot (ephemeris_snapshot.py) when one is
+    configured and covers the date; computed with pyephem otherwise.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        longitudes = snapshot.longitudes(ephem.julian_date(observer.date))
+        if longitudes is not None:
+            return longitudes
+
+    sun = ephem.Sun(observer)
+    moon = ephem.Moon(observer)
+    return _ecliptic_of_date(sun, observer.date), _ecliptic_of_date(moon, observer.date)
+
+def sunrise_ecliptic_longitudes(latitude, longitude, timezone, year, month, day):
+    """
+    Finds local sunrise for the calendar date and samples the Sun and Moon there.
+
+    This is the per-element ephemeris lookup shared by the scalar calculation and
+    the batch engine (batch_engine.py); everything derived from it is plain arithmetic.
+    Sunrise comes from the interpolated grid in sunrise_grid.py (exact search near the poles).
+
+    Returns:
+        tuple: (julian_date, sun_longitude, moon_longitude, sunrise_status), longitudes in
+               radians. sunrise_status is SUNRISE_OK, or ALWAYS_UP / NEVER_UP when the Sun
+               does not rise that day; the sample is then taken at local noon instead.
+    """
+    # Search from an hour before local midnight (converted to UTC) so the first rising
+    # found is the sunrise of the given calendar date. Timezone is float hours (e.g. -6.0).
+    local_midnight = datetime(year, month, day)
+    start_utc = local_midnight - timedelta(hours=timezone)
+    sunrise, status = next_sunrise(latitude, longitude, ephem.Date(start_utc - timedelta(hours=1)))
+
+    observer = make_observer(latitude, longitude)
+    if status == SUNRISE_OK:
+        observer.date = sunrise
+    else:
+        # No sunrise to anchor the day to (polar day or night); use local noon
+        observer.date = start_utc + timedelta(hours=12)
+
+    sun_lon, moon_lon = ecliptic_longitudes(observer)
+    return ephem.julian_date(observer.date), sun_lon, moon_lon, status
+
+def ayanamsa_degrees(julian_date, system=DEFAULT_SYSTEM):
+    """
+    Ayanamsa in degrees for a Julian date (scalar or NumPy array).
+
+    Read from the precomputed day-resolution table in ayanamsa.py (Lahiri by default,
+    or PANCHANGA_AYANAMSA=raman/kp), interpolated within the day.
+    """
+    return get_ayanamsa_table(system).lookup(julian_date)
@@ -0,0 +1,260 @@
+"""
+Precomputed Sun/Moon longitude snapshot, memory-mapped for zero-compute lookups.
+
+The file holds the geocentric apparent ecliptic longitudes of date of the Sun and Moon
+(the values ephemeris.ecliptic_longitudes computes with pyephem) sampled at a fixed
+step. Lookups interpolate between samples with a 4-point cubic, which stays within
+0.0001″ of pyephem at an hourly step (and ~0.02″ at six hours).
+
+The file is opened with numpy.memmap (read-only), so every process mapping it, such as
+the executor's worker processes, shares the same pages of the OS page cache, and only the
+pages actually read are loaded.
+
+Usage (from the repository root):
+    python ephemeris_snapshot.py generate --output ephemeris_snapshot.bin    # 1900-2100 hourly, ~28 MB
+    python ephemeris_snapshot.py verify ephemeris_snapshot.bin --samples 5000
+
+Then set PANCHANGA_EPHEMERIS_SNAPSHOT=ephemeris_snapshot.bin. Dates outside the file, or
+no file, fall back to pyephem.
+"""
+import os
+import sys
+import math
+import time
+import struct
+import random
+import argparse
+import threading
+from multiprocessing import Pool
+
+import ephem
+import numpy as np
+
+# Header: magic, format version, first sample (Julian date, UT), step (days), sample count
+MAGIC = b"PNCHEPH1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIddq")
+HEADER_SIZE = 64  # header padded so the float64 data stays aligned
+
+TWO_PI = 2 * math.pi
+
+DEFAULT_START_JD = 2415020.5  # 1900-01-01 00:00 UT
+DEFAULT_END_JD = 2488434.5    # 2100-12-31 00:00 UT
+DEFAULT_STEP_HOURS = 1.0
+
+
+def _sample(julian_dates):
+    """[(sun, moon)] longitudes in radians for each Julian date, straight from pyephem."""
+    # Imported here: ephemeris imports this module to use the snapshot
+    from ephemeris import julian_to_ephem_date, _ecliptic_of_date
+
+    observer = ephem.Observer()
+    rows = []
+    for julian_date in julian_dates:
+        observer.date = julian_to_ephem_date(julian_date)
+        sun = ephem.Sun(observer)
+        moon = ephem.Moon(observer)
+        rows.append((float(_ecliptic_of_date(sun, observer.date)), float(_ecliptic_of_date(moon, observer.date))))
+    return rows
+
+
+class EphemerisSnapshot:
+    """
+    Read-only view of a snapshot file.
+
+    Args:
+        path (str): File written by generate().
+
+    Raises:
+        ValueError: If the file is not a snapshot of a supported version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, start_jd, step, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} ephemeris snapshot")
+        self.start_jd = start_jd
+        self.step = step
+        self.count = count
+        self.end_jd = start_jd + step * (count - 1)
+        self.data = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(count, 2))
+        self.hits = 0
+        self.misses = 0
+
+    def covers(self, julian_date):
+        # The cubic needs one sample before and two after the bracketing interval
+        return self.start_jd + self.step <= julian_date < self.end_jd - self.step
+
+    def longitudes(self, julian_date):
+        """
+        Interpolated (sun, moon) longitudes in radians, or None outside the file's range.
+        """
+        if not self.covers(julian_date):
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        position = (julian_date - self.start_jd) / self.step
+        index = int(position)
+        t = position - index
+        # Lagrange weights for samples at -1, 0, 1, 2
+        w0 = -t * (t - 1) * (t - 2) / 6
+        w1 = (t + 1) * (t - 1) * (t - 2) / 2
+        w2 = -(t + 1) * t * (t - 2) / 2
+        w3 = (t + 1) * t * (t - 1) / 6
+
+        rows = self.data[index - 1:index + 3].tolist()
+        result = []
+        for body in (0, 1):
+            base = rows[1][body]
+            # Longitudes wrap at 2π; unwrap the neighbours around the sample at 0
+            values = []
+            for row in rows:
+                value = row[body] - base
+                if value > math.pi:
+                    value -= TWO_PI
+                elif value < -math.pi:
+                    value += TWO_PI
+                values.append(value)
+            interpolated = base + w0 * values[0] + w1 * values[1] + w2 * values[2] + w3 * values[3]
+            result.append(interpolated % TWO_PI)
+        return result[0], result[1]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "start_jd": self.start_jd,
+            "end_jd": self.end_jd,
+            "step_hours": round(self.step * 24, 6),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def generate(path, start_jd=DEFAULT_START_JD, end_jd=DEFAULT_END_JD, step_hours=DEFAULT_STEP_HOURS, workers=None, chunk=8760):
+    """
+    Samples pyephem from start_jd to end_jd (inclusive) and writes a snapshot file.
+
+    Sampling takes ~0.1 ms per step per core (1900-2100 hourly: ~3 min on one core);
+    it is split across `workers` processes.
+
+    Returns:
+        int: Number of samples written.
+    """
+    step = step_hours / 24.0
+    count = int(round((end_jd - start_jd) / step)) + 1
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, start_jd, step, count).ljust(HEADER_SIZE, b"\0"))
+    data = np.memmap(temp_path, dtype="<f8", mode="r+", offset=HEADER_SIZE, shape=(count, 2))
+
+    chunks = [
+        [start_jd + i * step for i in range(first, min(first + chunk, count))]
+        for first in range(0, count, chunk)
+    ]
+    started = time.perf_counter()
+    done = 0
+    with Pool(workers or os.cpu_count() or 1) as pool:
+        for rows in pool.imap(_sample, chunks):
+            data[done:done + len(rows)] = rows
+            done += len(rows)
+            print(f"\r{done}/{count} samples ({time.perf_counter() - started:.0f} s)", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    data.flush()
+    del data
+    # Readers never see a partially written file
+    os.replace(temp_path, path)
+    return count
+
+
+def verify(snapshot, samples=2000, seed=0):
+    """
+    Compares interpolated longitudes with pyephem at random times.
+
+    Returns:
+        dict: Max and 99th percentile absolute error per body, in arcseconds.
+    """
+    rng = random.Random(seed)
+    julian_dates = [
+        rng.uniform(snapshot.start_jd + snapshot.step, snapshot.end_jd - snapshot.step) for _ in range(samples)
+    ]
+    errors = {"sun": [], "moon": []}
+    for julian_date, (sun, moon) in zip(julian_dates, _sample(julian_dates)):
+        interpolated = snapshot.longitudes(julian_date)
+        for name, exact, value in (("sun", sun, interpolated[0]), ("moon", moon, interpolated[1])):
+            diff = (value - exact + math.pi) % TWO_PI - math.pi
+            errors[name].append(abs(math.degrees(diff)) * 3600)
+
+    report = {"samples": samples}
+    for name, values in errors.items():
+        values.sort()
+        report[f"{name}_max_arcsec"] = values[-1]
+        report[f"{name}_p99_arcsec"] = values[int(0.99 * (len(values) - 1))]
+    return report
+
+
+_snapshot = None
+_snapshot_loaded = False
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Returns the EphemerisSnapshot at PANCHANGA_EPHEMERIS_SNAPSHOT, or None if unset or
+    unreadable (callers then use pyephem). Opened once per process.
+    """
+    global _snapshot, _snapshot_loaded
+    if not _snapshot_loaded:
+        with _snapshot_lock:
+            if not _snapshot_loaded:
+                path = os.getenv("PANCHANGA_EPHEMERIS_SNAPSHOT", "").strip()
+                if path:
+                    try:
+                        _snapshot = EphemerisSnapshot(path)
+                    except (OSError, ValueError) as e:
+                        print(f"Ephemeris snapshot disabled: {e}")
+                _snapshot_loaded = True
+    return _snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate or verify a Sun/Moon longitude snapshot file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Sample pyephem into a snapshot file")
+    gen.add_argument("--output", default="ephemeris_snapshot.bin")
+    gen.add_argument("--start-year", type=int, default=1900)
+    gen.add_argument("--end-year", type=int, default=2100, help="Last year covered (inclusive)")
+    gen.add_argument("--step-hours", type=float, default=DEFAULT_STEP_HOURS)
+    gen.add_argument("--workers", type=int, help="Sampling processes (default: CPU count)")
+
+    check = commands.add_parser("verify", help="Compare a snapshot file against pyephem")
+    check.add_argument("path")
+    check.add_argument("--samples", type=int, default=2000)
+    check.add_argument("--tolerance-arcsec", type=float, default=0.5, help="Fail if any error exceeds this")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        start_jd = ephem.julian_date(ephem.Date(f"{args.start_year}/1/1"))
+        end_jd = ephem.julian_date(ephem.Date(f"{args.end_year}/12/31"))
+        count = generate(args.output, start_jd, end_jd, args.step_hours, args.workers)
+        print(f"Wrote {count} samples to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+        return 0
+
+    report = verify(EphemerisSnapshot(args.path), args.samples)
+    for key, value in report.items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
+    worst = max(report["sun_max_arcsec"], report["moon_max_arcsec"])
+    if worst > args.tolerance_arcsec:
+        print(f"FAIL: max error {worst:.4f} arcsec exceeds {args.tolerance_arcsec} arcsec")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
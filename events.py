@@ -0,0 +1,342 @@
+import os
+import math
+import unicodedata
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import ephem
+
+from ephemeris import make_observer, julian_to_ephem_date, sunrise_ecliptic_longitudes
+from transitions import (
+    TITHI_SPAN, NAKSHATRA_SPAN, TITHI_RATE_RANGE, NAKSHATRA_RATE_RANGE,
+    angles_at, bracket_crossing, solve_crossing, julian_to_local_iso
+)
+from panchanga_tool import (
+    NAKSHATRA_NAMES, MASA_NAMES, panchanga_indexes, tithi_name_and_paksha
+)
+from normalize import normalize_location, utc_offset_hours, tzinfo_for, local_today
+from executor import run_cpu
+
+# Event search: the next occurrences of a Tithi, Nakshatra or Masa at a location.
+#
+# Instead of evaluating the Panchanga day by day, the search jumps from one boundary
+# crossing to the next. The time to the next wanted boundary is predicted from the
+# angle's mean motion, the prediction is bracketed by a day or two either side and the
+# exact crossing solved with the transitions.py solver. Each occurrence costs two
+# crossings (start and end) plus a sunrise lookup, whatever the gap between occurrences.
+
+EVENTS_MAX_DAYS = int(os.getenv("PANCHANGA_EVENTS_MAX_DAYS", "1830"))   # search horizon (~5 years)
+EVENTS_MAX_COUNT = int(os.getenv("PANCHANGA_EVENTS_MAX_COUNT", "100"))  # occurrences per request
+EVENTS_DEFAULT_COUNT = 5
+
+# Masa follows the solar rashi (see panchanga_indexes): 30 degrees of nirayana Sun longitude
+SOLAR_SPAN = 30.0
+SOLAR_RATE_RANGE = (0.9, 1.1)
+
+# Mean motions (degrees/day): synodic month, sidereal month, sidereal year
+MEAN_ELONGATION_RATE = 360.0 / 29.530589
+MEAN_MOON_RATE = 360.0 / 27.321662
+MEAN_SUN_RATE = 360.0 / 365.256363
+
+# kind: (index into transitions.angles_at, span, mean rate, rate bounds, prediction slack in days).
+# The true Moon runs up to ~7.5 degrees ahead of or behind its mean position (~0.6 days);
+# the Sun up to ~2 degrees (~2 days).
+ELEMENTS = {
+    "tithi": (0, TITHI_SPAN, MEAN_ELONGATION_RATE, TITHI_RATE_RANGE, 1.0),
+    "nakshatra": (1, NAKSHATRA_SPAN, MEAN_MOON_RATE, NAKSHATRA_RATE_RANGE, 1.0),
+    "masa": (2, SOLAR_SPAN, MEAN_SUN_RATE, SOLAR_RATE_RANGE, 2.5),
+}
+# When several conditions are given, occurrences of the first kind present are
+# enumerated and the others checked on the day it prevails
+KIND_ORDER = ("tithi", "nakshatra", "masa")
+ELEMENT_COUNTS = {"tithi": 30, "nakshatra": 27, "masa": 12}
+
+
+def _fold(text):
+    """Lowercase ASCII form of a name for matching: "Ekadashi" and "Ekādaśī" both fold to "ekadasi"."""
+    text = unicodedata.normalize("NFD", str(text))
+    text = "".join(c for c in text if c.isalpha() and not unicodedata.combining(c)).lower()
+    for spelling, folded in (("sh", "s"), ("ch", "c"), ("ri", "r"), ("ee", "i"), ("oo", "u")):
+        text = text.replace(spelling, folded)
+    # Doubled letters are spelt either way ("Kartika"/"Kārttika", "Purnimaa")
+    return "".join(c for i, c in enumerate(text) if i == 0 or c != text[i - 1])
+
+
+def _names_to_numbers():
+    """{kind: {folded name: [element numbers]}}, numbers as panchanga_indexes reports them."""
+    tithis = {}
+    for number in range(1, 31):
+        tithis.setdefault(_fold(tithi_name_and_paksha(number)[0]), []).append(number)
+    return {
+        "tithi": tithis,
+        "nakshatra": {_fold(name): [i + 1] for i, name in enumerate(NAKSHATRA_NAMES)},
+        "masa": {_fold(name): [i + 1] for i, name in enumerate(MASA_NAMES)},
+    }
+
+_NAMES = _names_to_numbers()
+
+
+def _parse_condition(kind, value, paksha=None):
+    """
+    Element numbers (tithi 1-30, nakshatra 1-27, masa 1-12 from Caitra) matching a
+    name or number. A tithi name other than Pūrṇimā/Amāvāsyā matches both pakshas
+    unless paksha ("shukla" or "krishna") is given.
+
+    Raises:
+        ValueError: If the value is not a known name or an in-range number.
+    """
+    text = str(value).strip()
+    if text.isdigit():
+        number = int(text)
+        if not 1 <= number <= ELEMENT_COUNTS[kind]:
+            raise ValueError(f"{kind} number must be between 1 and {ELEMENT_COUNTS[kind]}")
+        numbers = {number}
+    else:
+        numbers = set(_NAMES[kind].get(_fold(text), ()))
+        if not numbers:
+            raise ValueError(f"Unknown {kind} '{value}'")
+
+    if kind == "tithi" and paksha:
+        folded = _fold(paksha)
+        if folded.startswith("sukla"):
+            numbers = {n for n in numbers if n <= 15}
+        elif folded.startswith("krsna"):
+            numbers = {n for n in numbers if n > 15}
+        else:
+            raise ValueError(f"Unknown paksha '{paksha}' (use 'shukla' or 'krishna')")
+        if not numbers:
+            raise ValueError(f"Tithi '{value}' does not occur in {paksha} paksha")
+    return numbers
+
+
+def _segments(kind, numbers):
+    """Maps element numbers to segment indexes (floor(angle / span)) of the kind's angle."""
+    if kind == "masa":
+        # masa index = (solar rashi + 1) % 12, so masa number m (1 = Caitra) is rashi m - 2
+        return {(n - 2) % 12 for n in numbers}
+    return {n - 1 for n in numbers}
+
+
+def _element_name(kind, segment):
+    if kind == "tithi":
+        name, paksha = tithi_name_and_paksha(segment + 1)
+        return {"number": segment + 1, "name": name, "paksha": paksha}
+    if kind == "nakshatra":
+        return {"number": segment + 1, "name": NAKSHATRA_NAMES[segment]}
+    masa = (segment + 1) % 12
+    return {"number": masa + 1, "name": MASA_NAMES[masa]}
+
+
+def _next_crossing(angle_fn, julian_date, current, boundary, element):
+    """
+    First time after julian_date that the angle reaches boundary, predicted from the
+    mean motion and solved within a small bracket around the prediction.
+    """
+    _, _, mean_rate, rate_range, slack = element
+    predicted = julian_date + ((boundary - current) % 360.0) / mean_rate
+    try:
+        return solve_crossing(angle_fn, boundary, max(julian_date, predicted - slack), predicted + slack)
+    except ValueError:
+        # Prediction missed (angle exactly at the boundary, or the bracket too tight):
+        # bracket from the rate bounds instead
+        lo, hi = bracket_crossing(angle_fn, julian_date, current, boundary, rate_range, forward=True)
+        return solve_crossing(angle_fn, boundary, lo, hi)
+
+
+def _julian_midnight(day, timezone):
+    """Julian date of local midnight starting the given calendar date."""
+    offset = utc_offset_hours(timezone, day.year, day.month, day.day)
+    return ephem.julian_date(ephem.Date(datetime(day.year, day.month, day.day) - timedelta(hours=offset)))
+
+
+def _local_date(julian_date, timezone):
+    utc = julian_to_ephem_date(julian_date).datetime().replace(tzinfo=dt_timezone.utc)
+    return utc.astimezone(tzinfo_for(timezone)).date()
+
+
+def _prevailing_days(latitude, longitude, timezone, start, end):
+    """
+    The calendar days whose sunrise falls in [start, end), when the element is the one a
+    day-by-day Panchanga lookup reports (two days for a vṛddhi element spanning two sunrises).
+
+    Returns:
+        tuple: ([dates], at_sunrise, panchanga_indexes at the first day's sunrise). If no
+               sunrise falls inside (a kṣaya element), the day the element starts with
+               at_sunrise False.
+    """
+    day = _local_date(start, timezone)
+    days = []
+    first = found = None
+    for _ in range(40):
+        offset = utc_offset_hours(timezone, day.year, day.month, day.day)
+        jd, sun_lon, moon_lon, _ = sunrise_ecliptic_longitudes(latitude, longitude, offset, day.year, day.month, day.day)
+        if first is None:
+            first = panchanga_indexes(jd, sun_lon, moon_lon)
+        if jd >= end:
+            break
+        if jd >= start:
+            days.append(day)
+            if found is None:
+                found = panchanga_indexes(jd, sun_lon, moon_lon)
+        day += timedelta(days=1)
+    if not days:
+        return [_local_date(start, timezone)], False, first
+    return days, True, found
+
+
+def _day_matches(kind, numbers, indexes):
+    if kind == "tithi":
+        return (indexes["tithi"] or 30) in numbers
+    if kind == "nakshatra":
+        return indexes["nakshatra"] in numbers
+    return indexes["masa"] + 1 in numbers
+
+
+def find_events(latitude, longitude, timezone, tithi=None, nakshatra=None, masa=None, paksha=None,
+                start_date=None, end_date=None, count=None):
+    """
+    Finds the occurrences of a Tithi, Nakshatra and/or Masa condition from start_date on.
+
+    Occurrences of the first given kind (tithi, then nakshatra, then masa) are found by
+    jumping between boundary crossings; any other given conditions must hold at sunrise
+    on the day the occurrence prevails.
+
+    Args:
+        tithi (str|int): Tithi name (e.g. "Ekādaśī", "Ekadashi", "Pūrṇimā") or number 1-30.
+        nakshatra (str|int): Nakshatra name or number 1-27.
+        masa (str|int): Masa name or number 1-12 (1 = Caitra).
+        paksha (str): "shukla" or "krishna", narrowing a tithi name.
+        timezone (float|str): UTC offset in hours or IANA name (resolved per date).
+        start_date (date): First day searched (default: today at the location).
+        end_date (date): Last day searched (default: up to PANCHANGA_EVENTS_MAX_DAYS on).
+        count (int): Maximum occurrences returned (default 5, at most PANCHANGA_EVENTS_MAX_COUNT).
+
+    Returns:
+        dict: "events", each with the "date" the element prevails at sunrise ("dates" lists
+              both days of an element spanning two sunrises; at_sunrise is False for a
+              kṣaya element that spans none), the element's number, name,
+              "starts_at"/"ends_at" (ISO 8601 local) and that day's tithi/paksha/nakshatra/masa.
+
+    Raises:
+        ValueError: If no condition is given, paksha is given without tithi, or a
+                    condition, date or count is invalid.
+    """
+    conditions = {}
+    for kind, value in (("tithi", tithi), ("nakshatra", nakshatra), ("masa", masa)):
+        if value is not None and str(value).strip():
+            conditions[kind] = _parse_condition(kind, value, paksha if kind == "tithi" else None)
+    if not conditions:
+        raise ValueError("Give at least one of tithi, nakshatra or masa")
+    # paksha only narrows a tithi; accepting it alone would silently match both halves
+    if paksha is not None and str(paksha).strip() and "tithi" not in conditions:
+        raise ValueError("paksha narrows a tithi; give it together with tithi")
+
+    if start_date is None:
+        start_date = local_today(timezone)
+    start = start_date if isinstance(start_date, date) else date.fromisoformat(start_date)
+    if end_date is None:
+        end = start + timedelta(days=EVENTS_MAX_DAYS - 1)
+    else:
+        end = end_date if isinstance(end_date, date) else date.fromisoformat(end_date)
+        if end < start:
+            raise ValueError(f"end_date {end} is before start_date {start}")
+        if (end - start).days + 1 > EVENTS_MAX_DAYS:
+            raise ValueError(f"Search range exceeds the limit of {EVENTS_MAX_DAYS} days")
+    count = EVENTS_DEFAULT_COUNT if count is None else int(count)
+    if not 1 <= count <= EVENTS_MAX_COUNT:
+        raise ValueError(f"count must be between 1 and {EVENTS_MAX_COUNT}")
+
+    kind = next(k for k in KIND_ORDER if k in conditions)
+    element = ELEMENTS[kind]
+    angle_index, span = element[0], element[1]
+    segments = ELEMENT_COUNTS[kind]
+    targets = _segments(kind, conditions[kind])
+    observer = make_observer(latitude, longitude)
+
+    def angle_at(jd):
+        return angles_at(observer, jd)[angle_index]
+
+    search_start = _julian_midnight(start, timezone)
+    search_end = _julian_midnight(end + timedelta(days=1), timezone)
+
+    # The element in effect at the start may already be a match; its occurrence began earlier
+    jd = search_start
+    current = angle_at(jd)
+    segment = math.floor(current / span)
+    if segment in targets:
+        lo, hi = bracket_crossing(angle_at, jd, current, segment * span, element[3], forward=False)
+        occurrence_start = solve_crossing(angle_at, segment * span, lo, hi)
+    else:
+        segment, occurrence_start = None, None
+
+    events = []
+    while len(events) < count:
+        if occurrence_start is None:
+            # Jump to the nearest wanted boundary ahead (the angles only increase)
+            segment = min(targets, key=lambda s: (s * span - current) % 360.0)
+            occurrence_start = _next_crossing(angle_at, jd, current, (segment * span) % 360.0, element)
+        if occurrence_start >= search_end:
+            break
+        occurrence_end = _next_crossing(angle_at, occurrence_start, segment * span, ((segment + 1) * span) % 360.0, element)
+
+        days, at_sunrise, indexes = _prevailing_days(
+            latitude, longitude, timezone, max(occurrence_start, search_start), occurrence_end
+        )
+        days = [day for day in days if day <= end]
+        if not days:
+            break
+        if all(_day_matches(k, numbers, indexes) for k, numbers in conditions.items() if k != kind):
+            tithi_name, tithi_paksha = tithi_name_and_paksha(indexes["tithi"])
+            events.append({
+                "date": days[0].isoformat(),
+                "dates": [day.isoformat() for day in days],
+                "at_sunrise": at_sunrise,
+                kind: {
+                    **_element_name(kind, segment),
+                    "starts_at": julian_to_local_iso(occurrence_start, timezone),
+                    "ends_at": julian_to_local_iso(occurrence_end, timezone),
+                },
+                "panchanga": {
+                    "tithi": tithi_name,
+                    "paksha": tithi_paksha,
+                    "nakshatra": NAKSHATRA_NAMES[indexes["nakshatra"] - 1],
+                    "masa": MASA_NAMES[indexes["masa"]],
+                },
+            })
+
+        # Continue from the end of this occurrence, where the angle is on the next boundary
+        jd = occurrence_end
+        current = ((segment + 1) * span) % 360.0
+        occurrence_start = None
+        if (segment + 1) % segments in targets:
+            # The next element is wanted too: it starts right where this one ends
+            segment = (segment + 1) % segments
+            occurrence_start = occurrence_end
+
+    return {
+        "location": {"latitude": latitude, "longitude": longitude, "timezone": timezone},
+        "query": {"tithi": tithi, "nakshatra": nakshatra, "masa": masa, "paksha": paksha},
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "count": len(events),
+        "events": events,
+    }
+
+
+async def find_events_async(latitude, longitude, timezone, tithi=None, nakshatra=None, masa=None, paksha=None,
+                            start_date=None, end_date=None, count=None, location_name="Unknown"):
+    """
+    Runs find_events on the CPU executor.
+
+    Returns:
+        dict: find_events' result with the location name, or {"error": ...} for an
+              invalid query.
+    """
+    try:
+        latitude, longitude, timezone, location_name = normalize_location(latitude, longitude, timezone, location_name)
+        result = await run_cpu(
+            find_events, latitude, longitude, timezone, tithi, nakshatra, masa, paksha, start_date, end_date, count
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    result["location"]["name"] = location_name
+    return result
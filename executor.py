@@ -0,0 +1,153 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Executor modes
+MODE_PROCESS = "process"  # worker processes: ephemeris work uses every core
+MODE_THREAD = "thread"    # worker threads: keeps the event loop free, still bound by the GIL
+MODE_INLINE = "inline"    # run on the caller's thread (debugging, single-shot scripts)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class CPUExecutor:
+    """
+    Runs CPU-bound work (pyephem calculations, transliteration) off the event loop.
+
+    In process mode the pool is created on first use; if the platform cannot start
+    worker processes (no working semaphores, restricted sandbox), it falls back to a
+    thread pool. Functions submitted in process mode must be picklable (module-level).
+
+    Configuration (environment):
+        PANCHANGA_EXECUTOR: "process" (default), "thread" or "inline".
+        PANCHANGA_EXECUTOR_WORKERS: Worker processes (default: CPU count).
+        PANCHANGA_EXECUTOR_THREADS: Worker threads in thread mode or after fallback (default: 4).
+        PANCHANGA_EXECUTOR_START_METHOD: multiprocessing start method (default: spawn).
+    """
+
+    def __init__(self, mode=None, workers=None, threads=None, start_method=None):
+        self.mode = (mode or os.getenv("PANCHANGA_EXECUTOR", MODE_PROCESS)).strip().lower()
+        self.workers = workers or _env_int("PANCHANGA_EXECUTOR_WORKERS", os.cpu_count() or 1)
+        self.threads = threads or _env_int("PANCHANGA_EXECUTOR_THREADS", 4)
+        self.start_method = start_method or os.getenv("PANCHANGA_EXECUTOR_START_METHOD", "spawn")
+        self.fallback_reason = None
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            if self.mode == MODE_PROCESS:
+                try:
+                    context = multiprocessing.get_context(self.start_method)
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    return self._pool
+                except (OSError, ValueError, NotImplementedError, ImportError) as e:
+                    print(f"Process pool unavailable, falling back to threads: {e}")
+                    self.fallback_reason = str(e)
+                    self.mode = MODE_THREAD
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="panchanga-cpu")
+            return self._pool
+
+    def pool_size(self):
+        if self.mode == MODE_PROCESS:
+            return self.workers
+        if self.mode == MODE_THREAD:
+            return self.threads
+        return 1
+
+    def queue_depth(self):
+        """Tasks submitted but not yet picked up by a worker."""
+        return max(0, self.in_flight - self.pool_size())
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) in the pool and returns its result.
+
+        Raises:
+            Exception: Whatever fn raises.
+        """
+        if self.mode == MODE_INLINE:
+            return fn(*args, **kwargs)
+
+        pool = self._get_pool()
+        call = partial(fn, *args, **kwargs) if kwargs else partial(fn, *args)
+        self.submitted += 1
+        self.in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(pool, call)
+            except BrokenProcessPool as e:
+                # A broken process pool (e.g. a worker was killed) is not recoverable; use threads
+                self._fall_back(str(e))
+                result = await loop.run_in_executor(self._get_pool(), call)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def _fall_back(self, reason):
+        print(f"Process pool failed, falling back to threads: {reason}")
+        with self._lock:
+            old_pool, self._pool = self._pool, None
+            self.mode = MODE_THREAD
+            self.fallback_reason = reason
+        if old_pool is not None:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "pool_size": self.pool_size(),
+            "started": self._pool is not None,
+            "fallback_reason": self.fallback_reason,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+_executor = None
+
+
+def get_executor():
+    """Returns the process-wide CPUExecutor (created on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = CPUExecutor()
+    return _executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Runs a CPU-bound function on the shared executor."""
+    return await get_executor().run(fn, *args, **kwargs)
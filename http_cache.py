@@ -0,0 +1,65 @@
+import os
+import hashlib
+from datetime import datetime, timedelta
+
+from panchanga_tool import location_date_key, PANCHANGA_ENGINE
+from ayanamsa import DEFAULT_SYSTEM as AYANAMSA_SYSTEM
+
+# Bump to invalidate every client/CDN copy after a change to the calculations
+ETAG_VERSION = os.getenv("PANCHANGA_ETAG_VERSION", "1")
+
+# max-age (seconds) for an explicit date; the result for a fixed date never changes
+EXPLICIT_DATE_MAX_AGE = int(os.getenv("PANCHANGA_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# max-age for requests without a date: "today" changes at the location's midnight
+TODAY_MAX_AGE = int(os.getenv("PANCHANGA_CACHE_TODAY_MAX_AGE", "300"))
+
+
+def is_explicit_date(year, month, day):
+    """True when the request names a full date instead of defaulting to today."""
+    return year is not None and month is not None and day is not None
+
+
+def request_etag(kind, latitude, longitude, timezone, year, month, day, location_name):
+    """
+    Strong ETag for a response, derived only from the normalized request.
+
+    Two requests that normalize to the same key (coordinates rounded as in the ephemeris
+    cache, resolved date, location name) get the same ETag, so a match can be answered
+    with 304 before anything is computed.
+    """
+    key = location_date_key(latitude, longitude, timezone, year, month, day)
+    source = "|".join(
+        [ETAG_VERSION, PANCHANGA_ENGINE, AYANAMSA_SYSTEM, kind, repr(key), location_name]
+    )
+    return '"' + hashlib.sha256(source.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def cache_control(explicit_date, now=None):
+    """Cache-Control value: long-lived for explicit dates, until midnight (capped) for today."""
+    if explicit_date:
+        return f"public, max-age={EXPLICIT_DATE_MAX_AGE}"
+    now = now or datetime.now()
+    until_midnight = int((datetime(now.year, now.month, now.day) + timedelta(days=1) - now).total_seconds())
+    return f"public, max-age={max(0, min(TODAY_MAX_AGE, until_midnight))}"
+
+
+def caching_headers(etag, explicit_date, now=None):
+    # Vary on every header the auth middleware reads the key from (X-API-Key, or the
+    # MCP_API_KEY fallback) so a shared cache never serves one client's copy to another;
+    # a key in the api_key query parameter is already part of the URL
+    return {"ETag": etag, "Cache-Control": cache_control(explicit_date, now), "Vary": "X-API-Key, MCP_API_KEY"}
+
+
+def etag_matches(if_none_match, etag):
+    """Evaluates an If-None-Match header against etag (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,579 @@
+"""
+Load tests for the MCP server, fully offline.
+
+Starts loadtest.server (the real app with a fake C# API and fake TTS) in a subprocess
+and drives it over HTTP with closed-loop virtual users, ramping the concurrency in
+stages. Every stage reports throughput, latency percentiles per operation and the
+server's memory (RSS of the server process and its executor workers); each workload
+gets a fresh server, so memory growth is attributable to it.
+
+Workloads:
+    rest    GET /api/panchanga, /api/sankalpam and /api/events/next
+    voice   GET /api/voice/stream (fake TTS)
+    mcp     tools/call over the SSE transport (GET /sse, POST /messages/), one session per user
+    mixed   all of the above, weighted roughly like production traffic
+
+Requests mostly target a few cities over the next days (festival-day traffic, see
+--hot-ratio), with jittered coordinates and both IANA names and offsets for timezones;
+the rest are random places and dates that miss every cache.
+
+Usage (from the repository root):
+    python -m loadtest.run
+    python -m loadtest.run --workloads mixed --stages 8,32,128 --stage-seconds 30 --hot-ratio 0.9
+    python -m loadtest.run --workloads rest --max-p99-ms 250 --max-error-rate 0.01   # exits 1 if exceeded
+
+Results are written as JSON (default: loadtest/results/<UTC time>-<commit>.json).
+"""
+import os
+import sys
+import json
+import time
+import glob
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import httpx
+
+from benchmarks.run import summarize, git_commit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = os.getenv("MCP_API_KEY", "panchanga-secret-key")
+
+# Relative weights of the operations in each workload
+WORKLOADS = {
+    "rest": {"panchanga": 6, "sankalpam": 3, "events": 1},
+    "voice": {"voice_stream": 1},
+    "mcp": {"mcp_panchanga": 7, "mcp_sankalpam": 3},
+    "mixed": {
+        "panchanga": 45, "sankalpam": 20, "events": 5, "voice_stream": 10,
+        "mcp_panchanga": 15, "mcp_sankalpam": 5,
+    },
+}
+
+# (name, latitude, longitude, timezone) as clients send them: IANA names and offsets
+CITIES = [
+    ("Frisco, TX", 33.1507, -96.8236, "America/Chicago"),
+    ("New York, NY", 40.7128, -74.0060, "America/New_York"),
+    ("London, UK", 51.5074, -0.1278, "Europe/London"),
+    ("Mumbai, India", 19.0760, 72.8777, 5.5),
+    ("Chennai, India", 13.0827, 80.2707, "Asia/Kolkata"),
+    ("Singapore", 1.3521, 103.8198, 8.0),
+    ("Sydney, Australia", -33.8688, 151.2093, "Australia/Sydney"),
+    ("Toronto, Canada", 43.6532, -79.3832, "America/Toronto"),
+]
+EVENT_TITHIS = ("Ekadashi", "Purnima", "Amavasya", "Caturthi")
+
+MB = 1024 * 1024
+
+
+class RequestGenerator:
+    """
+    Query parameters for one request.
+
+    With probability hot_ratio: one of CITIES on one of the next hot_days days (or
+    without a date, meaning today there), coordinates jittered below the normalization
+    precision. Otherwise a random place near a city on a random date, which misses every
+    cache.
+    """
+
+    def __init__(self, rng, hot_ratio, hot_days):
+        self.rng = rng
+        self.hot_ratio = hot_ratio
+        self.hot_days = hot_days
+        self.today = date.today()
+
+    def params(self):
+        rng = self.rng
+        name, latitude, longitude, timezone = rng.choice(CITIES)
+        if rng.random() < self.hot_ratio:
+            latitude += rng.uniform(-4e-5, 4e-5)
+            longitude += rng.uniform(-4e-5, 4e-5)
+            day = self.today + timedelta(days=rng.randrange(self.hot_days))
+            if rng.random() < 0.3:
+                return {"latitude": latitude, "longitude": longitude, "timezone": timezone, "location_name": name}
+        else:
+            latitude += rng.uniform(-2, 2)
+            longitude += rng.uniform(-2, 2)
+            day = date(1990, 1, 1) + timedelta(days=rng.randrange(365 * 45))
+        return {
+            "latitude": round(latitude, 6), "longitude": round(longitude, 6), "timezone": timezone,
+            "year": day.year, "month": day.month, "day": day.day, "location_name": name,
+        }
+
+
+class McpSession:
+    """
+    One MCP client session over the SSE transport.
+
+    Responses arrive as `message` events on the GET /sse stream; requests are POSTed to
+    the endpoint the server announces first, and matched to responses by id.
+    """
+
+    def __init__(self, client, timeout):
+        self.client = client
+        self.timeout = timeout
+        self.endpoint = None
+        self._response = None
+        self._lines = None
+        self._reader = None
+        self._pending = {}
+        self._next_id = 0
+
+    async def open(self):
+        self._response = await self.client.send(self.client.build_request("GET", "/sse"), stream=True)
+        if self._response.status_code != 200:
+            raise ConnectionError(f"GET /sse returned {self._response.status_code}")
+        self._lines = self._response.aiter_lines()
+        event, data = await self._next_event()
+        if event != "endpoint":
+            raise ConnectionError(f"Expected the endpoint event, got {event}")
+        self.endpoint = data
+        self._reader = asyncio.create_task(self._read())
+        await self.request("initialize", {
+            "protocolVersion": "2024-11-05", "capabilities": {},
+            "clientInfo": {"name": "loadtest", "version": "1"},
+        })
+        await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def _next_event(self):
+        event, data = "message", []
+        async for line in self._lines:
+            if not line:
+                if data:
+                    return event, "\n".join(data)
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            # Lines starting with ":" are keep-alive comments
+        raise ConnectionError("SSE stream closed")
+
+    async def _read(self):
+        try:
+            while True:
+                event, data = await self._next_event()
+                if event != "message":
+                    continue
+                message = json.loads(data)
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"SSE stream failed: {e}"))
+            self._pending.clear()
+
+    async def _post(self, message):
+        response = await self.client.post(self.endpoint, json=message)
+        if response.status_code not in (200, 202):
+            raise ConnectionError(f"POST {self.endpoint} returned {response.status_code}")
+
+    async def request(self, method, params):
+        self._next_id += 1
+        request_id = self._next_id
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            await self._post({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call_tool(self, name, arguments):
+        """Calls a tool; True if it returned a result without an error."""
+        message = await self.request("tools/call", {"name": name, "arguments": arguments})
+        result = message.get("result")
+        if "error" in message or not result or result.get("isError"):
+            return False
+        content = result.get("content") or [{}]
+        try:
+            return "error" not in json.loads(content[0].get("text", "{}"))
+        except ValueError:
+            return False
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self._response:
+            await self._response.aclose()
+
+
+def _ok(response):
+    return response.status_code == 200 and "error" not in response.json()
+
+
+async def op_panchanga(client, params, rng):
+    return _ok(await client.get("/api/panchanga", params=params))
+
+
+async def op_sankalpam(client, params, rng):
+    return _ok(await client.get("/api/sankalpam", params=params))
+
+
+async def op_events(client, params, rng):
+    query = {k: params[k] for k in ("latitude", "longitude", "timezone", "location_name")}
+    query["tithi"] = rng.choice(EVENT_TITHIS)
+    query["count"] = 3
+    if "year" in params:
+        query["start_date"] = date(params["year"], params["month"], params["day"]).isoformat()
+    return _ok(await client.get("/api/events/next", params=query))
+
+
+async def op_voice_stream(client, params, rng):
+    async with client.stream("GET", "/api/voice/stream", params=params) as response:
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+        return response.status_code == 200 and size > 0
+
+
+OPERATIONS = {
+    "panchanga": op_panchanga,
+    "sankalpam": op_sankalpam,
+    "events": op_events,
+    "voice_stream": op_voice_stream,
+}
+# MCP operations: tool name called over the user's SSE session
+MCP_TOOLS = {
+    "mcp_panchanga": "get_panchanga_data",
+    "mcp_sankalpam": "get_sankalpam_text",
+}
+
+
+class Recorder:
+    """Latencies and error counts per operation."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, op, duration, ok):
+        if ok:
+            self.latencies.setdefault(op, []).append(duration)
+        else:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self, elapsed):
+        ops = sorted(set(self.latencies) | set(self.errors))
+        operations = {
+            op: summarize(self.latencies.get(op, []), self.errors.get(op, 0), elapsed) for op in ops
+        }
+        # Session setup is reported but not counted as a request
+        requests = [op for op in ops if op != "mcp_connect"]
+        total = summarize(
+            [d for op in requests for d in self.latencies.get(op, [])],
+            sum(self.errors.get(op, 0) for op in requests),
+            elapsed,
+        )
+        return total, operations
+
+
+def process_tree_rss(pid):
+    """RSS in bytes of pid and its descendants (the executor's workers), or None off Linux."""
+    total = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for children in glob.glob(f"/proc/{current}/task/*/children"):
+                with open(children) as f:
+                    pending.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        if current == pid:
+            return None
+    return total
+
+
+class MemorySampler:
+    """Samples the server's RSS every `interval` seconds; tracks the peak since reset()."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def sample(self):
+        rss = process_tree_rss(self.pid)
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+        return rss
+
+    def reset(self):
+        self.peak = 0
+        return self.sample()
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+def _mb(value):
+    return round(value / MB, 1) if value is not None else None
+
+
+async def run_stage(client, workload, concurrency, seconds, args, recorder, seed):
+    """Runs `concurrency` virtual users for `seconds`, each looping over weighted operations."""
+    names = list(WORKLOADS[workload])
+    weights = [WORKLOADS[workload][name] for name in names]
+    deadline = time.perf_counter() + seconds
+
+    async def user(index):
+        rng = random.Random(seed * 100003 + index)
+        generator = RequestGenerator(rng, args.hot_ratio, args.hot_days)
+        session = None
+        try:
+            while time.perf_counter() < deadline:
+                op = rng.choices(names, weights)[0]
+                params = generator.params()
+                if op in MCP_TOOLS and session is None:
+                    start = time.perf_counter()
+                    session = McpSession(client, args.timeout)
+                    try:
+                        await session.open()
+                        recorder.record("mcp_connect", time.perf_counter() - start, True)
+                    except Exception:
+                        recorder.record("mcp_connect", time.perf_counter() - start, False)
+                        await session.close()
+                        session = None
+                        continue
+
+                start = time.perf_counter()
+                try:
+                    if op in MCP_TOOLS:
+                        ok = await session.call_tool(MCP_TOOLS[op], params)
+                    else:
+                        ok = await asyncio.wait_for(OPERATIONS[op](client, params, rng), args.timeout)
+                except Exception:
+                    ok = False
+                    if op in MCP_TOOLS:
+                        # Start a new session rather than reuse a broken one
+                        await session.close()
+                        session = None
+                recorder.record(op, time.perf_counter() - start, ok)
+                if args.think_ms:
+                    await asyncio.sleep(rng.expovariate(1000.0 / args.think_ms))
+        finally:
+            if session is not None:
+                await session.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port, log_file):
+    env = dict(os.environ, PANCHANGA_EXECUTOR=args.executor, MCP_API_KEY=API_KEY)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "loadtest.server", "--port", str(port),
+            "--upstream-latency-ms", str(args.upstream_latency_ms),
+            "--tts-latency-ms", str(args.tts_latency_ms),
+        ],
+        cwd=REPO_ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(client, process, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def run_workload(workload, stages, args):
+    """Starts a fresh server, warms it up, then runs every stage; returns the workload's report."""
+    port = free_port()
+    log_file = tempfile.TemporaryFile()
+    process = start_server(args, port, log_file)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(stages) * 2)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", headers={"X-API-Key": API_KEY}, timeout=args.timeout, limits=limits
+        ) as client:
+            await wait_ready(client, process)
+            sampler = MemorySampler(process.pid)
+            sampler.start()
+            try:
+                if args.warmup_seconds:
+                    await run_stage(client, workload, stages[0], args.warmup_seconds, args, Recorder(), seed=0)
+                baseline = sampler.reset()
+
+                rows = []
+                for index, concurrency in enumerate(stages, start=1):
+                    recorder = Recorder()
+                    rss_start = sampler.reset()
+                    elapsed = await run_stage(client, workload, concurrency, args.stage_seconds, args, recorder, seed=index)
+                    rss_end = sampler.sample()
+                    total, operations = recorder.summary(elapsed)
+                    row = {
+                        "concurrency": concurrency,
+                        "total": total,
+                        "operations": operations,
+                        "rss_start_mb": _mb(rss_start),
+                        "rss_end_mb": _mb(rss_end),
+                        "rss_peak_mb": _mb(sampler.peak),
+                    }
+                    rows.append(row)
+                    print_stage(workload, row)
+            finally:
+                sampler.stop()
+            final = sampler.sample()
+            health = (await client.get("/health")).json()
+    except Exception:
+        log_file.seek(0)
+        sys.stderr.write(log_file.read().decode("utf-8", "replace")[-4000:])
+        raise
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log_file.close()
+
+    return {
+        "workload": workload,
+        "stages": rows,
+        "rss_baseline_mb": _mb(baseline),
+        "rss_final_mb": _mb(final),
+        "rss_growth_mb": _mb(final - baseline) if final is not None and baseline is not None else None,
+        "server": {key: health.get(key) for key in ("caches", "executor", "coalescing")},
+    }
+
+
+def print_stage(workload, row):
+    total = row["total"]
+    memory = f"rss {row['rss_end_mb']} MB (peak {row['rss_peak_mb']})" if row["rss_end_mb"] is not None else ""
+    print(
+        f"{workload:6} c={row['concurrency']:<4} {total['throughput_rps']:9.1f} req/s  "
+        f"p50 {total['p50_ms']:8.2f} ms  p99 {total['p99_ms']:8.2f} ms  errors {total['errors']:<5} {memory}"
+    )
+    for op, summary in row["operations"].items():
+        print(
+            f"{'':6}   {op:14} {summary['requests']:7} req  p50 {summary['p50_ms']:8.2f} ms  "
+            f"p99 {summary['p99_ms']:8.2f} ms  errors {summary['errors']}"
+        )
+
+
+def check_limits(report, max_p99_ms, max_error_rate):
+    """Messages for every stage over the limits (none if within them or limits unset)."""
+    failures = []
+    for result in report["workloads"]:
+        for row in result["stages"]:
+            total = row["total"]
+            label = f"{result['workload']} c={row['concurrency']}"
+            if max_p99_ms and total["p99_ms"] > max_p99_ms:
+                failures.append(f"{label}: p99 {total['p99_ms']:.1f} ms exceeds {max_p99_ms:.1f} ms")
+            rate = total["errors"] / total["requests"] if total["requests"] else 0.0
+            if max_error_rate is not None and rate > max_error_rate:
+                failures.append(f"{label}: error rate {rate:.2%} exceeds {max_error_rate:.2%}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load tests for the Panchanga MCP server.")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"Comma-separated subset of: {', '.join(WORKLOADS)}")
+    parser.add_argument("--stages", default="1,8,32,64", help="Comma-separated concurrency (virtual users) per stage")
+    parser.add_argument("--stage-seconds", type=float, default=15.0, help="Duration of each stage")
+    parser.add_argument("--warmup-seconds", type=float, default=3.0, help="Unreported run before the first stage")
+    parser.add_argument("--hot-ratio", type=float, default=0.8, help="Share of requests for popular cities over the next days")
+    parser.add_argument("--hot-days", type=int, default=3, help="Days ahead covered by popular requests")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="Fake C# API response delay")
+    parser.add_argument("--tts-latency-ms", type=float, default=400.0, help="Fake TTS synthesis time")
+    parser.add_argument("--executor", default=os.getenv("PANCHANGA_EXECUTOR", "process"), help="PANCHANGA_EXECUTOR mode for the server")
+    parser.add_argument("--max-p99-ms", type=float, default=0.0, help="Exit 1 if any stage's p99 exceeds this (0: off)")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Exit 1 if any stage's error rate exceeds this (0-1)")
+    parser.add_argument("--output", help="Result file (default: loadtest/results/<UTC time>-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workloads = [w for w in args.workloads.split(",") if w]
+    stages = [int(c) for c in args.stages.split(",") if c]
+    for w in workloads:
+        if w not in WORKLOADS:
+            sys.exit(f"Unknown workload {w}; choose from {', '.join(WORKLOADS)}")
+    if not stages:
+        sys.exit("No stages given")
+
+    results = [asyncio.run(run_workload(workload, stages, args)) for workload in workloads]
+    for result in results:
+        print(
+            f"{result['workload']:6} memory: {result['rss_baseline_mb']} MB after warm-up, "
+            f"{result['rss_final_mb']} MB at the end ({result['rss_growth_mb']:+} MB)"
+            if result["rss_growth_mb"] is not None else f"{result['workload']:6} memory: not available on this platform"
+        )
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "executor": args.executor,
+            "stages": stages,
+            "stage_seconds": args.stage_seconds,
+            "hot_ratio": args.hot_ratio,
+            "think_ms": args.think_ms,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "tts_latency_ms": args.tts_latency_ms,
+        },
+        "workloads": results,
+    }
+
+    output = args.output
+    if not output:
+        stamp = datetime.now(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{stamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    failures = check_limits(report, args.max_p99_ms, args.max_error_rate)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
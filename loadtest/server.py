@@ -0,0 +1,63 @@
+"""
+The MCP server (mcp_server.secure_app) with its external services replaced by fakes.
+
+The C# API is replaced by benchmarks.fakes.StubUpstream, started in this process and
+wired in through PANCHANGAM_API_URL, and Edge TTS by a FakeCommunicate factory that
+returns canned MP3 frames. Everything else (caches, executor, coalescing, SSE transport)
+is the real server, served by uvicorn on a real socket.
+
+loadtest.run starts this as a subprocess, so the load generator does not compete with
+the server for the GIL and the server's memory can be measured on its own. It can also
+be run by hand to point other tools at:
+
+    python -m loadtest.server --port 8765 --upstream-latency-ms 20 --tts-latency-ms 400
+"""
+import os
+import sys
+import logging
+import argparse
+import tempfile
+
+from benchmarks.fakes import StubUpstream, fake_tts_factory
+
+API_KEY = os.getenv("MCP_API_KEY", "panchanga-secret-key")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MCP server against fake upstream and TTS services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="Fake C# API response delay")
+    parser.add_argument("--tts-latency-ms", type=float, default=400.0, help="Fake TTS synthesis time")
+    parser.add_argument("--tts-bytes", type=int, default=96 * 1024, help="Size of each fake MP3")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    upstream = StubUpstream(latency=args.upstream_latency_ms / 1000.0).start()
+    audio_dir = tempfile.TemporaryDirectory(prefix="loadtest_audio_")
+
+    # Configure the server before its modules read the environment
+    os.environ["PANCHANGAM_API_URL"] = upstream.url
+    os.environ.setdefault("SANKALPAM_AUDIO_CACHE_DIR", audio_dir.name)
+    os.environ.setdefault("MCP_API_KEY", API_KEY)
+
+    import uvicorn
+    import panchanga_tool
+    import mcp_server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    panchanga_tool.set_tts_factory(fake_tts_factory(latency=args.tts_latency_ms / 1000.0, size=args.tts_bytes))
+
+    try:
+        uvicorn.run(mcp_server.secure_app, host=args.host, port=args.port, log_level="warning", access_log=False)
+    finally:
+        upstream.stop()
+        audio_dir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import os
+import json
+import math
+from datetime import date, datetime, timedelta
+
+import ephem
+
+from ephemeris import make_observer, sunrise_ecliptic_longitudes, ayanamsa_degrees
+from sunrise_grid import next_sunrise, next_sunset
+from panchanga_tool import (
+    NAKSHATRA_NAMES, MASA_NAMES, panchanga_indexes, tithi_name_and_paksha, get_transitions_local
+)
+
+# Same name tables the C# SanskritNamesService loads
+SANSKRIT_NAMES_PATH = os.getenv(
+    "SANSKRIT_NAMES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sanskrit-names.json")
+)
+
+_names = None
+
+
+def _get_names():
+    global _names
+    if _names is None:
+        with open(SANSKRIT_NAMES_PATH, "r", encoding="utf-8") as f:
+            _names = json.load(f)
+    return _names
+
+
+def _name(category, number, fallback):
+    return _get_names().get(category, {}).get(str(number), f"{fallback}-{number}")
+
+
+def _time_in_dms(local_dt):
+    """TimeInDms shape of the C# API (local time of day as degrees/minutes/seconds)."""
+    if local_dt is None:
+        return None
+    return {"degrees": local_dt.hour, "minutes": local_dt.minute, "seconds": local_dt.second}
+
+
+def _to_local(ephem_date, timezone):
+    return ephem.Date(ephem_date).datetime() + timedelta(hours=timezone)
+
+
+def _rise_set_times(latitude, longitude, timezone, year, month, day):
+    """
+    Local sunrise, sunset, moonrise and moonset for the calendar date (None where the
+    body does not rise/set that day).
+    """
+    observer = make_observer(latitude, longitude)
+    local_midnight = datetime(year, month, day)
+    day_start = ephem.Date(local_midnight - timedelta(hours=timezone))
+    day_end = ephem.Date(day_start + 1)
+
+    def event(fn, body, start):
+        observer.date = start
+        try:
+            when = fn(body)
+        except (ephem.AlwaysUpError, ephem.NeverUpError):
+            return None
+        return when if when < day_end else None
+
+    def sun_event(fn, start):
+        when, _ = fn(latitude, longitude, start)
+        return when if when is not None and when < day_end else None
+
+    # Sun from the sunrise grid, like the sunrise the elements are sampled at
+    sunrise = sun_event(next_sunrise, ephem.Date(day_start - ephem.hour))
+    sunset = sun_event(next_sunset, sunrise if sunrise is not None else day_start)
+    moonrise = event(observer.next_rising, ephem.Moon(), day_start)
+    moonset = event(observer.next_setting, ephem.Moon(), day_start)
+    return sunrise, sunset, moonrise, moonset
+
+
+def _samvatsara_number(year, solar_sign):
+    # Same Saka-year rule as PanchangaService.CalculateSamvatsaraAsync:
+    # solar signs 10-12 (Makara..Mina, ~Jan-Apr) still belong to the previous Saka year
+    effective_year = year - 1 if solar_sign >= 10 else year
+    saka_year = effective_year - 78
+    number = ((saka_year + 11) % 60) + 1
+    return number + 60 if number <= 0 else number
+
+
+def compute_panchanga(latitude, longitude, timezone, year, month, day, location_name="Unknown", transitions=None, with_transitions=True):
+    """
+    Computes the full Panchanga locally from pyephem, without the C# API.
+
+    Returns the same JSON shape as the C# PanchangaController (camelCase PanchangaData),
+    with Tithi/Nakshatra/Masa from the same sunrise sample as get_accurate_panchanga_local
+    and Samvatsara/Ritu/Vara/Yoga/Karana plus rise/set times computed here. The fields
+    get_panchanga adds to upstream responses (starts_at/ends_at, calculation_method) are
+    included, so no overrides are applied afterwards.
+
+    Args:
+        transitions (dict, optional): get_transitions_local result for the same location
+            and date, if the caller already has it (used for the end times).
+        with_transitions (bool, optional): Look the transitions up when not given. False
+            leaves the end times null, for callers that only need the names.
+
+    Raises:
+        ValueError: If the date or location is invalid.
+    """
+    date(year, month, day)  # validates the date
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and -12 <= timezone <= 14):
+        raise ValueError("Invalid location coordinates or timezone")
+
+    jd, sun_lon, moon_lon, _ = sunrise_ecliptic_longitudes(latitude, longitude, timezone, year, month, day)
+    indexes = panchanga_indexes(jd, sun_lon, moon_lon)
+
+    # Tithi (1-30), named as in get_accurate_panchanga_local
+    tithi_number = indexes["tithi"] or 30
+    tithi_name, _ = tithi_name_and_paksha(indexes["tithi"])
+
+    nakshatra_number = indexes["nakshatra"]
+
+    # Yoga: sum of Nirayana Sun and Moon longitudes in 13°20′ steps
+    ayanamsa = ayanamsa_degrees(jd)
+    yoga_total = (math.degrees(sun_lon) + math.degrees(moon_lon) - 2 * ayanamsa) % 360.0
+    yoga_number = math.ceil(yoga_total * 27 / 360.0) or 27
+
+    # Karana: half-tithi (6° of elongation)
+    elongation = math.degrees(moon_lon - sun_lon) % 360.0
+    karana_number = math.ceil(elongation / 6.0) or 60
+
+    # Vara: weekday of the local date, 0 = Sunday (Bhānuvāra)
+    vara_number = (date(year, month, day).weekday() + 1) % 7
+
+    # Samvatsara and Ritu follow the C# service, from the solar sign (1 = Mesha)
+    solar_sign = indexes["solar_rashi"] + 1
+    samvatsara_number = _samvatsara_number(year, solar_sign)
+    ritu_number = (solar_sign - 1) // 2
+
+    # Numbered like CalculateMasaAsync: the solar sign (1 = Mesha), while the name is the
+    # lunar (amanta) month that get_panchanga's overrides put on upstream responses too
+    masa_number = solar_sign
+
+    sunrise, sunset, moonrise, moonset = _rise_set_times(latitude, longitude, timezone, year, month, day)
+    day_duration = (sunset - sunrise) * 24.0 if sunrise is not None and sunset is not None else 0
+
+    # Transition times come from the (cached) transition solver, the same result
+    # get_panchanga uses for starts_at/ends_at on upstream responses
+    if transitions is None and with_transitions:
+        transitions = get_transitions_local(latitude, longitude, timezone, year, month, day)
+
+    def end_time(element):
+        if not transitions or element not in transitions:
+            return None
+        return _time_in_dms(datetime.fromisoformat(transitions[element]["ends_at"]))
+
+    def bounds(element):
+        # starts_at/ends_at (ISO 8601), as get_panchanga adds them to upstream responses
+        if not transitions or element not in transitions:
+            return {}
+        return {"starts_at": transitions[element]["starts_at"], "ends_at": transitions[element]["ends_at"]}
+
+    return {
+        "date": {"year": year, "month": month, "day": day, "isValid": True},
+        "location": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "timezone": timezone,
+            "name": location_name,
+            "isValid": True
+        },
+        "tithi": {"number": tithi_number, "name": tithi_name, "endTime": end_time("tithi"), "isSkipped": False, **bounds("tithi")},
+        "nakshatra": {
+            "number": nakshatra_number,
+            "name": NAKSHATRA_NAMES[nakshatra_number - 1],
+            "endTime": end_time("nakshatra"),
+            "isSkipped": False,
+            **bounds("nakshatra")
+        },
+        "yoga": {"number": yoga_number, "name": _name("yogas", yoga_number, "Yoga"), "endTime": end_time("yoga"), "isSkipped": False},
+        "karana": {"number": karana_number, "name": _name("karanas", karana_number, "Karana")},
+        "vara": {"number": vara_number, "name": _name("varas", vara_number, "Vara")},
+        "masa": {"number": masa_number, "name": MASA_NAMES[indexes["masa"]], "isLeapMonth": False},
+        "samvatsara": {"number": samvatsara_number, "name": _name("samvats", samvatsara_number, "Samvatsara")},
+        "ritu": {"number": ritu_number, "name": _name("ritus", ritu_number, "Ritu")},
+        "sunrise": _time_in_dms(_to_local(sunrise, timezone)) if sunrise is not None else None,
+        "sunset": _time_in_dms(_to_local(sunset, timezone)) if sunset is not None else None,
+        "moonrise": _time_in_dms(_to_local(moonrise, timezone)) if moonrise is not None else None,
+        "moonset": _time_in_dms(_to_local(moonset, timezone)) if moonset is not None else None,
+        "dayDurationHours": day_duration,
+        "additionalTithi": None,
+        "additionalNakshatra": None,
+        "additionalYoga": None,
+        "calculation_method": "High Precision (pyephem)"
+    }
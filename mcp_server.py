@@ -1,70 +1,98 @@
 import os
+import time
+import asyncio
 import uvicorn
 import base64
-import uuid
-from fastapi import FastAPI, Request, HTTPException, Depends
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from mcp.server.fastmcp import FastMCP
-from panchanga_tool import get_panchanga, get_sankalpam, get_sankalpam_voice
+from datetime import datetime, timedelta, timezone as dt_timezone
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, FileResponse, StreamingResponse, Response
+from panchanga_tool import (
+    get_sankalpam_voice_async, get_panchanga_range_async, get_cache_stats, get_panchanga_batch_async,
+    get_sankalpam_voice_text_async, stream_sankalpam_audio, fetch_shared_audio, join_audio_in_flight, get_coalescing_stats, TTS_VOICE
+)
+# The MCP server and its tools live in mcp_tools so stdio mode can load them without FastAPI
+from mcp_tools import mcp, precomputed_table, lookup_or_get_panchanga, lookup_or_get_sankalpam
+from normalize import normalize_request
+from events import find_events_async, EVENTS_DEFAULT_COUNT, EVENTS_MAX_COUNT
+from audio_cache import get_audio_cache
+from transliteration import get_devanagari_table
+from precompute import load_locations, PrecomputeScheduler
+from upstream_client import get_upstream_client
+from cache_backend import get_cache_backend
+from executor import get_executor
+from http_cache import is_explicit_date, request_etag, caching_headers, etag_matches
+from metrics import REGISTRY, HTTP_REQUEST_DURATION, cache_samples, render_metrics
 
 # Configuration
 API_KEY_NAME = "X-API-Key"
 API_KEY = os.getenv("MCP_API_KEY", "panchanga-secret-key")
+# /metrics exposes cache, executor and coalescing internals, so it needs the API key
+# unless explicitly opened (e.g. for a scraper on a private network)
+METRICS_PUBLIC = os.getenv("PANCHANGA_METRICS_PUBLIC", "false").lower() in ("1", "true", "yes")
+
+PRECOMPUTE_ENABLED = os.getenv("PANCHANGA_PRECOMPUTE_ENABLED", "false").lower() in ("1", "true", "yes")
 
-# Initialize FastMCP
-# We set host="0.0.0.0" to ensure it binds/allows all interfaces, though we mount it manually.
-# This helps prevent "Invalid Host header" (421) errors if FastMCP sets up TrustedHostMiddleware.
-mcp = FastMCP("Panchangam Service", host="0.0.0.0")
+precompute_scheduler = None
 
 # -----------------------------------------------------------------------------
-# Tool Definitions
+# Metrics
 # -----------------------------------------------------------------------------
 
-@mcp.tool()
-def get_panchanga_data(latitude: float, longitude: float, timezone: float, year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
-    """
-    Get the Hindu Panchanga details for a specific location and date.
-    Returns Tithi, Nakshatra, Yoga, Karana, Vara, Sunrise, Sunset, etc.
-    """
-    return get_panchanga(latitude, longitude, timezone, year, month, day, location_name)
+@REGISTRY.register_collector
+def _collect_runtime_metrics():
+    caches = get_cache_stats()
+    caches["precomputed"] = precomputed_table.stats()
+    samples = cache_samples(caches)
 
-@mcp.tool()
-def get_sankalpam_text(latitude: float, longitude: float, timezone: float, year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
-    """
-    Get the Sankalpam mantra text for a specific location and date.
-    Includes Samvatsara, Ayana, Ritu, Masa, Paksha, Tithi, Vara, Nakshatra.
-    """
-    return get_sankalpam(latitude, longitude, timezone, year, month, day, location_name)
+    executor_stats = get_executor().stats()
+    labels = {"mode": executor_stats["mode"]}
+    samples.append(("panchanga_executor_queue_depth", "gauge", "CPU tasks waiting for a worker.", labels, executor_stats["queue_depth"]))
+    samples.append(("panchanga_executor_in_flight", "gauge", "CPU tasks submitted and not yet finished.", labels, executor_stats["in_flight"]))
+    samples.append(("panchanga_executor_tasks_total", "counter", "CPU tasks completed.", labels, executor_stats["completed"]))
+
+    for stage, stats in get_coalescing_stats().items():
+        labels = {"stage": stage}
+        samples.append(("panchanga_coalesced_requests_total", "counter", "Calls that joined an identical call already in flight.", labels, stats["coalesced"]))
+        samples.append(("panchanga_coalescing_calls_total", "counter", "Calls through the request-coalescing layer.", labels, stats["calls"]))
+    return samples
+
+def _route_label(scope):
+    """Route template for the request (e.g. /api/panchanga), keeping label cardinality bounded."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    if path.startswith("/messages"):
+        return "/messages/"
+    if path == "/sse":
+        return "/sse"
+    return "other"
+
+class MetricsMiddleware:
+    """Records the latency of every HTTP request by route, method and status."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
 
-@mcp.tool()
-def get_sankalpam_audio(latitude: float, longitude: float, timezone: float, year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
-    """
-    Get the Sankalpam audio as a base64 encoded MP3 string.
-    Returns JSON with 'sankalpam_text', 'sankalpam_devanagari', and 'audio_base64'.
-    """
-    # Generate audio
-    # The tool now generates a unique filename based on location and time.
-    # It also handles cleanup of old files automatically.
-    
-    result = get_sankalpam_voice(latitude, longitude, timezone, year, month, day, location_name)
-    
-    if "error" in result:
-        return result
-        
-    audio_path = result.get("audio_file")
-    if audio_path and os.path.exists(audio_path):
         try:
-            with open(audio_path, "rb") as audio_file:
-                encoded_string = base64.b64encode(audio_file.read()).decode('utf-8')
-                
-            result["audio_base64"] = encoded_string
-            # Cleanup
-            # os.remove(audio_path) 
-        except Exception as e:
-            return {"error": f"Failed to encode audio: {str(e)}"}
-            
-    return result
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, _route_label(scope), scope["method"], status[0])
 
 # -----------------------------------------------------------------------------
 from fastapi.middleware.cors import CORSMiddleware
@@ -90,7 +118,7 @@ class APIKeyMiddleware:
             return
         
         # Allow health checks or open endpoints
-        if path in ["/health", "/docs", "/openapi.json"]:
+        if path in ["/health", "/docs", "/openapi.json"] or (path == "/metrics" and METRICS_PUBLIC):
              await self.app(scope, receive, send)
              return
              
@@ -120,13 +148,36 @@ class APIKeyMiddleware:
 # Server Application Expose
 # -----------------------------------------------------------------------------
 
+@asynccontextmanager
+async def lifespan(app):
+    global precompute_scheduler
+    # Build the Devanagari name/template table now rather than on the first voice request
+    await asyncio.to_thread(get_devanagari_table)
+
+    precompute_task = None
+    if PRECOMPUTE_ENABLED:
+        precompute_scheduler = PrecomputeScheduler(precomputed_table, load_locations())
+        precompute_task = asyncio.create_task(precompute_scheduler.run())
+
+    yield
+
+    if precompute_task is not None:
+        precompute_task.cancel()
+    # Release pooled upstream connections and CPU workers on shutdown
+    await get_upstream_client().aclose()
+    await get_cache_backend().close()
+    get_executor().shutdown()
+
 # Create a secure wrapper application
-secure_app = FastAPI()
+secure_app = FastAPI(lifespan=lifespan)
 
 # Add API Key Middleware FIRST (Inner-most)
 # This will run AFTER CORS middleware on the way in, and BEFORE CORS middleware on the way out
 secure_app.add_middleware(APIKeyMiddleware)
 
+# Time requests outside the auth check so rejected requests are counted too
+secure_app.add_middleware(MetricsMiddleware)
+
 # Add CORS Middleware LAST (Outer-most)
 # This ensures it wraps everything else and can handle OPTIONS requests
 # and add headers even if inner middleware returns errors (like 403).
@@ -148,50 +199,160 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 @secure_app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "panchanga-mcp"}
+    caches = get_cache_stats()
+    caches["precomputed"] = precompute_scheduler.stats() if precompute_scheduler else precomputed_table.stats()
+    return {"status": "healthy", "service": "panchanga-mcp", "caches": caches, "executor": get_executor().stats(), "coalescing": get_coalescing_stats()}
+
+@secure_app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of latency histograms, stage timers and cache counters"""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # -----------------------------------------------------------------------------
 # REST Endpoints for n8n / External Apps
 # -----------------------------------------------------------------------------
 
+async def cached_response(request, kind, fetch, latitude, longitude, timezone, year, month, day, location_name):
+    """
+    Serves a deterministic date query with ETag/Cache-Control headers.
+    The request is normalized first, so equivalent requests share one ETag, and a matching
+    If-None-Match is answered with 304 before anything is computed.
+    """
+    explicit = is_explicit_date(year, month, day)
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)}, headers={"Cache-Control": "no-store"})
+    # "today" is the location's date, so it expires at the location's midnight
+    local_now = datetime.now(dt_timezone(timedelta(hours=timezone))).replace(tzinfo=None)
+    headers = caching_headers(
+        request_etag(kind, latitude, longitude, timezone, year, month, day, location_name), explicit, local_now
+    )
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    result = await fetch(latitude, longitude, timezone, year, month, day, location_name)
+    if "error" in result:
+        # Don't let clients or proxies hold on to a failure
+        return JSONResponse(content=result, headers={"Cache-Control": "no-store"})
+    return JSONResponse(content=result, headers=headers)
+
 @secure_app.get("/api/panchanga")
 async def rest_get_panchanga(
+    request: Request,
     latitude: float, 
     longitude: float, 
-    timezone: float, 
+    timezone: str, 
     year: int = None, 
     month: int = None, 
     day: int = None, 
     location_name: str = "Unknown"
 ):
     """REST endpoint to get Panchanga data (High Precision)"""
-    return get_panchanga(latitude, longitude, timezone, year, month, day, location_name)
+    return await cached_response(request, "panchanga", lookup_or_get_panchanga, latitude, longitude, timezone, year, month, day, location_name)
+
+@secure_app.get("/api/panchanga/range")
+async def rest_get_panchanga_range(
+    latitude: float, 
+    longitude: float, 
+    timezone: str, 
+    start_date: str, 
+    end_date: str, 
+    location_name: str = "Unknown"
+):
+    """REST endpoint to get Panchanga data for each day in a date range (YYYY-MM-DD, inclusive)"""
+    result = await get_panchanga_range_async(latitude, longitude, timezone, start_date, end_date, location_name)
+    if "error" in result:
+        return JSONResponse(status_code=400, content=result)
+    return result
+
+@secure_app.get("/api/events/next")
+async def rest_get_next_events(
+    latitude: float,
+    longitude: float,
+    timezone: str,
+    tithi: str = None,
+    nakshatra: str = None,
+    masa: str = None,
+    paksha: str = None,
+    start_date: str = None,
+    count: int = EVENTS_DEFAULT_COUNT,
+    location_name: str = "Unknown"
+):
+    """REST endpoint to find the next `count` dates of a Tithi/Nakshatra/Masa from start_date (default today)"""
+    result = await find_events_async(latitude, longitude, timezone, tithi, nakshatra, masa, paksha, start_date, None, count, location_name)
+    if "error" in result:
+        return JSONResponse(status_code=400, content=result)
+    return result
+
+@secure_app.get("/api/events/search")
+async def rest_search_events(
+    latitude: float,
+    longitude: float,
+    timezone: str,
+    start_date: str,
+    end_date: str,
+    tithi: str = None,
+    nakshatra: str = None,
+    masa: str = None,
+    paksha: str = None,
+    count: int = EVENTS_MAX_COUNT,
+    location_name: str = "Unknown"
+):
+    """REST endpoint to find every date of a Tithi/Nakshatra/Masa between start_date and end_date (YYYY-MM-DD, inclusive)"""
+    result = await find_events_async(latitude, longitude, timezone, tithi, nakshatra, masa, paksha, start_date, end_date, count, location_name)
+    if "error" in result:
+        return JSONResponse(status_code=400, content=result)
+    return result
+
+class BatchRequest(BaseModel):
+    items: List[dict]
+    include_sankalpam: bool = False
+
+@secure_app.post("/api/panchanga/batch")
+async def rest_get_panchanga_batch(request: BatchRequest):
+    """REST endpoint to get Panchanga data for many locations/dates in one request"""
+    result = await get_panchanga_batch_async(request.items, request.include_sankalpam, panchanga_fn=lookup_or_get_panchanga)
+    if "error" in result:
+        return JSONResponse(status_code=400, content=result)
+    return result
 
 @secure_app.get("/api/sankalpam")
 async def rest_get_sankalpam(
+    request: Request,
     latitude: float, 
     longitude: float, 
-    timezone: float, 
+    timezone: str, 
     year: int = None, 
     month: int = None, 
     day: int = None, 
     location_name: str = "Unknown"
 ):
     """REST endpoint to get Sankalpam text"""
-    return get_sankalpam(latitude, longitude, timezone, year, month, day, location_name)
+    return await cached_response(request, "sankalpam", lookup_or_get_sankalpam, latitude, longitude, timezone, year, month, day, location_name)
 
 @secure_app.get("/api/voice")
 async def rest_get_voice(
     latitude: float, 
     longitude: float, 
-    timezone: float, 
+    timezone: str, 
     year: int = None, 
     month: int = None, 
     day: int = None, 
     location_name: str = "Unknown"
 ):
     """REST endpoint to get Sankalpam Audio (Base64)"""
-    result = get_sankalpam_voice(latitude, longitude, timezone, year, month, day, location_name)
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    result = await get_sankalpam_voice_async(
+        latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn=lookup_or_get_sankalpam
+    )
     
     # Handle error or file reading logic (duplicated from tool for safety)
     if "error" in result:
@@ -203,12 +364,78 @@ async def rest_get_voice(
             with open(audio_path, "rb") as audio_file:
                 encoded_string = base64.b64encode(audio_file.read()).decode('utf-8')
             result["audio_base64"] = encoded_string
-            # Optional: Cleanup is handled in get_sankalpam_voice mostly, but we can do it here too if needed
+            # The file stays in the audio cache (LRU-evicted there), so it is not removed here
         except Exception as e:
             return JSONResponse(status_code=500, content={"error": f"Failed to encode audio: {str(e)}"})
             
     return result
 
+@secure_app.get("/api/voice/stream")
+async def rest_stream_voice(
+    latitude: float, 
+    longitude: float, 
+    timezone: str, 
+    year: int = None, 
+    month: int = None, 
+    day: int = None, 
+    location_name: str = "Unknown"
+):
+    """
+    REST endpoint to stream Sankalpam Audio as audio/mpeg.
+    Cached audio is served from disk (with Range support); otherwise Edge TTS chunks
+    are forwarded as they arrive.
+    """
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    text = await get_sankalpam_voice_text_async(
+        latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn=lookup_or_get_sankalpam
+    )
+    if "error" in text:
+        return JSONResponse(status_code=400, content=text)
+
+    devanagari = text["sankalpam_devanagari"]
+    headers = {"Content-Disposition": 'inline; filename="sankalpam.mp3"'}
+
+    cached_path = get_audio_cache().get(devanagari, TTS_VOICE)
+    if cached_path:
+        headers["X-Audio-Cache"] = "hit"
+        # FileResponse handles Range / If-Range requests for us
+        return FileResponse(cached_path, media_type="audio/mpeg", headers=headers)
+
+    # Another replica may have synthesized it already
+    shared_path = await fetch_shared_audio(devanagari, TTS_VOICE)
+    if shared_path:
+        headers["X-Audio-Cache"] = "shared"
+        return FileResponse(shared_path, media_type="audio/mpeg", headers=headers)
+
+    # Or it is being synthesized for another request right now; wait for that instead
+    # of starting a second TTS session
+    joined_path = await join_audio_in_flight(devanagari, TTS_VOICE)
+    if joined_path:
+        headers["X-Audio-Cache"] = "coalesced"
+        return FileResponse(joined_path, media_type="audio/mpeg", headers=headers)
+
+    # Pull the first chunk before responding so TTS failures still return a JSON error
+    audio_stream = stream_sankalpam_audio(devanagari)
+    try:
+        first_chunk = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        return JSONResponse(status_code=502, content={"error": "Audio generation returned no audio"})
+    except Exception as e:
+        return JSONResponse(status_code=502, content={"error": f"Audio generation failed: {str(e)}"})
+
+    async def body():
+        yield first_chunk
+        async for chunk in audio_stream:
+            yield chunk
+
+    headers["X-Audio-Cache"] = "miss"
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
+
 # Mount the MCP server
 # FastMCP instances are ASGI applications
 secure_app.mount("/", mcp.sse_app())
@@ -0,0 +1,173 @@
+"""
+The MCP server and its tools, without any HTTP machinery.
+
+Imported by run_local.py (stdio transport) on its own and by mcp_server.py, which mounts
+it under the authenticated FastAPI app for SSE and adds the REST endpoints. Keep this
+module free of FastAPI and of imports only the HTTP server needs, so stdio clients
+(launched per IDE session) start quickly.
+"""
+import os
+import json
+import base64
+from typing import List, Union
+from mcp.server.fastmcp import FastMCP
+from panchanga_tool import (
+    get_panchanga_async, get_sankalpam_async, get_sankalpam_voice_async, get_panchanga_range_async,
+    get_panchanga_batch_async
+)
+from normalize import normalize_request, canonical_key
+from precompute import get_precomputed_table
+from cache_backend import get_cache_backend, get_or_compute
+from metrics import timed_tool
+
+# Initialize FastMCP
+# We set host="0.0.0.0" to ensure it binds/allows all interfaces, though we mount it manually.
+# This helps prevent "Invalid Host header" (421) errors if FastMCP sets up TrustedHostMiddleware.
+mcp = FastMCP("Panchangam Service", host="0.0.0.0")
+
+# -----------------------------------------------------------------------------
+# Precomputed Lookups
+# -----------------------------------------------------------------------------
+
+precomputed_table = get_precomputed_table()
+
+def _encode_result(result):
+    # Errors are not cached, so the next request retries
+    if "error" in result:
+        return None
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+async def lookup_or_get_panchanga(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
+    """
+    Serves Panchanga from the precomputed table, then the shared cache, else computes it
+    (once across replicas for concurrent misses).
+
+    The request is normalized first (see normalize.py), so timezone may be an IANA name.
+    """
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    data = precomputed_table.get("panchanga", latitude, longitude, timezone, year, month, day)
+    if data is None:
+        data = await get_or_compute(
+            get_cache_backend(),
+            canonical_key("panchanga", latitude, longitude, timezone, year, month, day),
+            lambda: get_panchanga_async(latitude, longitude, timezone, year, month, day, location_name),
+            encode=_encode_result, decode=json.loads,
+        )
+    # Cached entries are shared by every caller for this location, whatever they named it
+    if isinstance(data.get("location"), dict):
+        data["location"]["name"] = location_name
+    return data
+
+async def lookup_or_get_sankalpam(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
+    """Serves the Sankalpam from the precomputed table, then the shared cache, else computes it."""
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    result = precomputed_table.get("sankalpam", latitude, longitude, timezone, year, month, day)
+    if result is None:
+        result = await get_or_compute(
+            get_cache_backend(),
+            canonical_key("sankalpam", latitude, longitude, timezone, year, month, day),
+            lambda: get_sankalpam_async(latitude, longitude, timezone, year, month, day, location_name),
+            encode=_encode_result, decode=json.loads,
+        )
+    return result
+
+# -----------------------------------------------------------------------------
+# Tool Definitions
+# -----------------------------------------------------------------------------
+
+@mcp.tool()
+@timed_tool
+async def get_panchanga_data(latitude: float, longitude: float, timezone: Union[float, str], year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
+    """
+    Get the Hindu Panchanga details for a specific location and date.
+    timezone is an IANA name (e.g. "America/Chicago", resolved for the date) or a UTC offset in hours.
+    Returns Tithi, Nakshatra, Yoga, Karana, Vara, Sunrise, Sunset, etc.
+    """
+    return await lookup_or_get_panchanga(latitude, longitude, timezone, year, month, day, location_name)
+
+@mcp.tool()
+@timed_tool
+async def get_panchanga_range(latitude: float, longitude: float, timezone: Union[float, str], start_date: str, end_date: str, location_name: str = "Unknown"):
+    """
+    Get the Hindu Panchanga for every day in a date range (e.g. a month or a year) in one call.
+    Dates are YYYY-MM-DD, end_date inclusive. Returns one Panchanga entry per day under 'days'.
+    """
+    return await get_panchanga_range_async(latitude, longitude, timezone, start_date, end_date, location_name)
+
+@mcp.tool()
+@timed_tool
+async def get_panchanga_batch(items: List[dict], include_sankalpam: bool = False):
+    """
+    Get the Hindu Panchanga for many locations/dates in one call (e.g. a multi-city dashboard).
+    Each item is {"latitude", "longitude", "timezone", "location_name", "date" (YYYY-MM-DD)}.
+    Returns one entry per item, in order, under 'results'; failed items carry an 'error'.
+    """
+    return await get_panchanga_batch_async(items, include_sankalpam, panchanga_fn=lookup_or_get_panchanga)
+
+@mcp.tool()
+@timed_tool
+async def find_panchanga_events(latitude: float, longitude: float, timezone: Union[float, str], tithi: str = None, nakshatra: str = None, masa: str = None, paksha: str = None, start_date: str = None, end_date: str = None, count: int = 5, location_name: str = "Unknown"):
+    """
+    Find the next dates of a Tithi, Nakshatra and/or Masa at a location in one call,
+    e.g. the next Ekādaśī (tithi="Ekadashi"), Pūrṇimā, Amāvāsyā or a given nakshatra.
+    Names or numbers (tithi 1-30, nakshatra 1-27, masa 1-12); paksha is "shukla" or "krishna".
+    Searches from start_date (default today) to end_date (YYYY-MM-DD, optional).
+    Returns up to `count` events, each with the 'date' it prevails at sunrise and its start/end times.
+    """
+    # Imported on first use, like the ephemeris modules it builds on (see panchanga_tool)
+    from events import find_events_async
+
+    return await find_events_async(latitude, longitude, timezone, tithi, nakshatra, masa, paksha, start_date, end_date, count, location_name)
+
+@mcp.tool()
+@timed_tool
+async def get_sankalpam_text(latitude: float, longitude: float, timezone: Union[float, str], year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
+    """
+    Get the Sankalpam mantra text for a specific location and date.
+    Includes Samvatsara, Ayana, Ritu, Masa, Paksha, Tithi, Vara, Nakshatra.
+    """
+    return await lookup_or_get_sankalpam(latitude, longitude, timezone, year, month, day, location_name)
+
+@mcp.tool()
+@timed_tool
+async def get_sankalpam_audio(latitude: float, longitude: float, timezone: Union[float, str], year: int = None, month: int = None, day: int = None, location_name: str = "Unknown"):
+    """
+    Get the Sankalpam audio as a base64 encoded MP3 string.
+    Returns JSON with 'sankalpam_text', 'sankalpam_devanagari', and 'audio_base64'.
+    """
+    # Audio is cached by a hash of (voice, Devanagari text), so a repeated Sankalpam is
+    # read from disk; the cache evicts least recently used files past its size limit.
+    try:
+        latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+            latitude, longitude, timezone, year, month, day, location_name
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    result = await get_sankalpam_voice_async(
+        latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn=lookup_or_get_sankalpam
+    )
+    
+    if "error" in result:
+        return result
+        
+    audio_path = result.get("audio_file")
+    if audio_path and os.path.exists(audio_path):
+        try:
+            with open(audio_path, "rb") as audio_file:
+                encoded_string = base64.b64encode(audio_file.read()).decode('utf-8')
+                
+            result["audio_base64"] = encoded_string
+        except Exception as e:
+            return {"error": f"Failed to encode audio: {str(e)}"}
+            
+    return result
@@ -0,0 +1,215 @@
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+
+# Latency buckets in seconds: sub-millisecond cache hits up to slow TTS sessions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        key = tuple(str(v) for v in labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(tuple(str(v) for v in labelvalues), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels (Prometheus semantics)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labelvalues):
+        series = self._series.get(tuple(str(v) for v in labelvalues))
+        return sum(series[:-1]) if series else 0
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield self.name + "_bucket", _format_labels(self.labelnames, key, ("le", _format_value(float(bound)))), cumulative
+            yield self.name + "_sum", _format_labels(self.labelnames, key), series[-1]
+            yield self.name + "_count", _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format.
+
+    Collectors are callables run at scrape time that return extra samples as
+    (name, type, documentation, {label: value}, value) tuples, for values that already
+    live elsewhere (cache counters, executor queue depth).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+
+        families = {}
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, type_name, documentation, labels, value in samples:
+                family = families.setdefault(name, (type_name, documentation, []))
+                family[2].append((labels, value))
+        for name, (type_name, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "panchanga_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status code.",
+    ("route", "method", "status"),
+))
+
+MCP_TOOL_DURATION = REGISTRY.register(Histogram(
+    "panchanga_mcp_tool_duration_seconds",
+    "MCP tool call latency by tool and outcome.",
+    ("tool", "outcome"),
+))
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "panchanga_stage_duration_seconds",
+    "Time spent in each pipeline stage (upstream, ephemeris, local_engine, transliteration, tts).",
+    ("stage",),
+))
+
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "panchanga_upstream_errors_total",
+    "Failed upstream Panchanga API attempts (including retried ones) by reason.",
+    ("reason",),
+))
+
+
+@contextmanager
+def stage_timer(stage):
+    """Times a block of work as one pipeline stage (works around awaits too)."""
+    with STAGE_DURATION.time(stage):
+        yield
+
+
+def timed_tool(fn):
+    """Records the latency of an async MCP tool under its function name."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await fn(*args, **kwargs)
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+            return result
+        finally:
+            MCP_TOOL_DURATION.observe(time.perf_counter() - start, fn.__name__, outcome)
+    return wrapper
+
+
+def cache_samples(cache_stats):
+    """Collector samples for a {cache name: stats()} dict with hits/misses/hit_ratio."""
+    samples = []
+    for cache, stats in cache_stats.items():
+        labels = {"cache": cache}
+        samples.append(("panchanga_cache_hits_total", "counter", "Cache hits by cache.", labels, stats.get("hits", 0)))
+        samples.append(("panchanga_cache_misses_total", "counter", "Cache misses by cache.", labels, stats.get("misses", 0)))
+        samples.append(("panchanga_cache_hit_ratio", "gauge", "Cache hit ratio by cache.", labels, stats.get("hit_ratio", 0.0)))
+    return samples
+
+
+def render_metrics():
+    return REGISTRY.render()
@@ -0,0 +1,186 @@
+import os
+import re
+import math
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+# Request normalization: every REST route and MCP tool passes its location and date
+# through here first, so requests for the same place and day (33.1507 vs 33.15071,
+# "America/Chicago" vs -6.0 in winter) share one cache entry, coalesced computation
+# and ETag.
+
+# Decimal places kept on coordinates. 3 places is ~110 m, which moves sunrise by well
+# under a second; nothing in the Panchanga is that sensitive.
+COORD_PRECISION = int(os.getenv("PANCHANGA_COORD_PRECISION", "3"))
+
+DEFAULT_LOCATION_NAME = "Unknown"
+MAX_LOCATION_NAME_LENGTH = 200
+
+# UTC offsets in use run from -12:00 to +14:00
+MIN_OFFSET_HOURS = -12.0
+MAX_OFFSET_HOURS = 14.0
+
+_OFFSET_PATTERN = re.compile(r"^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+
+def quantize_coordinate(value, limit, name="coordinate"):
+    """
+    Rounds a latitude/longitude to COORD_PRECISION decimal places.
+
+    Raises:
+        ValueError: If the value is not a number within [-limit, limit].
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(value) or abs(value) > limit:
+        raise ValueError(f"{name} must be between {-limit} and {limit}")
+    # + 0.0 turns -0.0 into 0.0, so both give the same key
+    return round(value, COORD_PRECISION) + 0.0
+
+
+def _check_offset(hours):
+    if not math.isfinite(hours) or not MIN_OFFSET_HOURS <= hours <= MAX_OFFSET_HOURS:
+        raise ValueError(f"timezone offset must be between {MIN_OFFSET_HOURS:+g} and {MAX_OFFSET_HOURS:+g} hours")
+    # Hand-entered offsets like 5.5000001 or 5.49 snap to the minute
+    return round(hours * 60) / 60 + 0.0
+
+
+def parse_timezone(value):
+    """
+    Validates a timezone given as a UTC offset or an IANA name.
+
+    Accepts a number of hours (-6, 5.5), the same as a string ("-6.0"), "+05:30" /
+    "UTC+5:30", or an IANA name ("America/Chicago", "Asia/Kolkata").
+
+    Returns:
+        float | str: Offset in hours, or the IANA name (whose offset depends on the date;
+                     see utc_offset_hours).
+
+    Raises:
+        ValueError: If the value is none of these.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _check_offset(float(value))
+    text = str(value or "").strip()
+    if not text:
+        raise ValueError("timezone is required")
+    try:
+        hours = float(text)
+    except ValueError:
+        hours = None
+    if hours is not None:
+        return _check_offset(hours)
+    match = _OFFSET_PATTERN.match(text)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = int(hours) + int(minutes or 0) / 60
+        return _check_offset(-offset if sign == "-" else offset)
+    if text.upper() in ("UTC", "GMT", "Z"):
+        return 0.0
+    try:
+        return ZoneInfo(text).key
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
+    # Hand-typed names are often in the wrong case ("asia/kolkata")
+    name = _zone_names_by_lowercase().get(text.lower())
+    if name is None:
+        raise ValueError(f"Unknown timezone '{text}' (use an IANA name like 'Asia/Kolkata' or an offset in hours)")
+    return name
+
+
+@lru_cache(maxsize=1)
+def _zone_names_by_lowercase():
+    return {name.lower(): name for name in available_timezones()}
+
+
+def utc_offset_hours(timezone, year, month, day):
+    """
+    UTC offset in hours on a date, for an offset or IANA name from parse_timezone.
+
+    Names are resolved at local noon: DST changes happen overnight, so this is the
+    offset in force at sunrise and for most of the day.
+    """
+    if not isinstance(timezone, str):
+        return float(timezone)
+    local_noon = datetime(year, month, day, 12, tzinfo=ZoneInfo(timezone))
+    return local_noon.utcoffset().total_seconds() / 3600.0
+
+
+def tzinfo_for(timezone):
+    """datetime tzinfo for an offset in hours or an IANA name."""
+    if isinstance(timezone, str):
+        return ZoneInfo(timezone)
+    return dt_timezone(timedelta(hours=timezone))
+
+
+def local_today(timezone, now=None):
+    """Today's date at the location (not the server's), for an offset or IANA name."""
+    now = now or datetime.now(dt_timezone.utc)
+    return now.astimezone(tzinfo_for(timezone)).date()
+
+
+def normalize_location_name(location_name):
+    """Collapses whitespace; empty names become DEFAULT_LOCATION_NAME."""
+    name = " ".join(str(location_name or "").split())[:MAX_LOCATION_NAME_LENGTH]
+    return name or DEFAULT_LOCATION_NAME
+
+
+def normalize_location(latitude, longitude, timezone, location_name=DEFAULT_LOCATION_NAME):
+    """
+    Quantizes coordinates and validates the timezone, for requests spanning several dates.
+
+    Returns:
+        tuple: (latitude, longitude, timezone, location_name), timezone as parse_timezone
+               returns it (an offset, or an IANA name to resolve per date).
+
+    Raises:
+        ValueError: If a coordinate or the timezone is invalid.
+    """
+    return (
+        quantize_coordinate(latitude, 90, "latitude"),
+        quantize_coordinate(longitude, 180, "longitude"),
+        parse_timezone(timezone),
+        normalize_location_name(location_name),
+    )
+
+
+def normalize_request(latitude, longitude, timezone, year=None, month=None, day=None, location_name=DEFAULT_LOCATION_NAME):
+    """
+    Canonical form of a single-date request.
+
+    Missing date parts are filled from today's date at the location, and the timezone is
+    resolved to the offset in force on that date.
+
+    Returns:
+        tuple: (latitude, longitude, timezone_hours, year, month, day, location_name)
+
+    Raises:
+        ValueError: If a coordinate, the timezone or the date is invalid.
+    """
+    latitude, longitude, timezone, location_name = normalize_location(latitude, longitude, timezone, location_name)
+    if year is None or month is None or day is None:
+        today = local_today(timezone)
+        year = today.year if year is None else year
+        month = today.month if month is None else month
+        day = today.day if day is None else day
+    try:
+        date(int(year), int(month), int(day))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid date {year}-{month}-{day}: {e}")
+    year, month, day = int(year), int(month), int(day)
+    return latitude, longitude, utc_offset_hours(timezone, year, month, day), year, month, day, location_name
+
+
+def canonical_key(kind, latitude, longitude, timezone, year, month, day):
+    """
+    Cache key for a normalized request, e.g. "panchanga:33.151:-96.824:-6:2025-12-23".
+
+    The location name is not part of it: results are shared by every name for the place.
+    """
+    return (
+        f"{kind}:{latitude:.{COORD_PRECISION}f}:{longitude:.{COORD_PRECISION}f}:{timezone:+g}:"
+        f"{year:04d}-{month:02d}-{day:02d}"
+    )
@@ -1,20 +1,19 @@
-import requests
 import json
 import os
-import time
-import glob
-import re
+import copy
 from datetime import datetime
 import unicodedata
 import asyncio
-import nest_asyncio
-import edge_tts
-from indic_transliteration import sanscript
-import ephem
 import math
-
-# Apply nest_asyncio to allow nested event loops
-nest_asyncio.apply()
+import httpx
+from upstream_client import get_upstream_client
+from cache import TTLCache
+from audio_cache import get_audio_cache
+from cache_backend import get_cache_backend, get_or_compute, shared_key
+from executor import run_cpu
+from metrics import stage_timer
+from singleflight import SingleFlight
+from normalize import normalize_location, normalize_request, utc_offset_hours
 
 # Sanskrit Names Data
 TITHI_NAMES = [
@@ -34,129 +33,249 @@ MASA_NAMES = [
     "Āśvina", "Kārttika", "Mārgaśīrṣa", "Pauṣa", "Māgha", "Phālguna"
 ]
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+
+# Sankalpam sentence; the placeholders are the keys of build_sankalpam's "components".
+# transliteration.py renders the same template in Devanagari.
+SANKALPAM_TEMPLATE = (
+    "Śrī Śubha {samvatsara} Nāma Samvatsare, {ayana}, {ritu} Ṛtau, "
+    "{masa} Māse, {paksha}, {tithi} Śubha Tithau, "
+    "{vara} Vāsara Yuktāyām, {nakshatra} Nakṣatra Yuktāyām, "
+    "Śubha Yoga Śubha Karaṇa Evaṃ Guṇa Viśeṣaṇa Viśiṣṭāyām, "
+    "Asyāṃ Śubha Tithau..."
+)
+UTTARAYANA = "Uttarāyaṇe"
+DAKSHINAYANA = "Dakṣiṇāyane"
+PAKSHA_NAMES = ("Śukla Pakṣe", "Kṛṣṇa Pakṣe", "Pakṣe")
+
+# Where the full Panchanga comes from:
+#   "upstream" (default) - the C# Panchanga API at PANCHANGAM_API_URL
+#   "local"              - local_engine.compute_panchanga, no network hop
+PANCHANGA_ENGINE = os.getenv("PANCHANGA_ENGINE", "upstream").strip().lower()
+
+# Memoized results of the local ephemeris calculation.
+# Keyed by rounded coordinates, timezone and calendar date; results never change for a key,
+# the TTL only bounds how long an entry occupies memory.
+EPHEM_CACHE_PRECISION = 4  # decimal places (~11 m), far below anything that moves sunrise
+_ephem_cache = TTLCache(
+    maxsize=int(os.getenv("PANCHANGA_EPHEM_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PANCHANGA_EPHEM_CACHE_TTL", "86400")),
+)
+# Start/end times of the elements, memoized separately under the same keys: they take
+# most of a cold calculation and only Panchanga responses show them (the Sankalpam
+# needs just the names)
+_transitions_cache = TTLCache(
+    maxsize=int(os.getenv("PANCHANGA_EPHEM_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PANCHANGA_EPHEM_CACHE_TTL", "86400")),
+)
+
+def location_date_key(latitude, longitude, timezone, year, month, day):
+    """Cache key for a (location, date) pair: rounded coordinates, timezone and date."""
+    return (
+        round(float(latitude), EPHEM_CACHE_PRECISION),
+        round(float(longitude), EPHEM_CACHE_PRECISION),
+        float(timezone),
+        int(year), int(month), int(day),
+    )
 
 def get_accurate_panchanga_local(latitude, longitude, timezone, year, month, day):
     """
     Calculates accurate Panchanga elements using pyephem (high precision).
+    Results are memoized per (rounded lat, lon, timezone, date); see get_cache_stats().
     """
-    try:
-        observer = ephem.Observer()
-        observer.lat = str(latitude)
-        observer.lon = str(longitude)
-        
-        # Calculate start time for sunrise search (Local Midnight converted to UTC)
-        # We want the sunrise of the given calendar date.
-        # So start searching from slightly before local sunrise (e.g., local midnight - safety buffer).
-        # Actually, just using Local Midnight UTC is safe because sunrise is after midnight.
-        # Local Midnight = year/month/day 00:00:00
-        # UTC = Local - TimezoneOffset
-        
-        local_midnight = datetime(year, month, day)
-        # Handle timezone subtraction manually or using timedelta
-        # Timezone is float hours (e.g. -6.0)
-        start_utc = local_midnight - timedelta(hours=timezone)
-        
-        # Set observer date to start search (minus 1 hour buffer to be safe)
-        observer.date = start_utc - timedelta(hours=1)
-        
-        sun = ephem.Sun()
-        try:
-            sunrise = observer.next_rising(sun)
-            observer.date = sunrise
-        except:
-            # Fallback to noon local time if sunrise calc fails
-            noon_utc = local_midnight + timedelta(hours=12) - timedelta(hours=timezone)
-            observer.date = noon_utc
-
-        sun = ephem.Sun(observer)
-        moon = ephem.Moon(observer)
-        
-        # Get Ecliptic Coordinates (Geocentric)
-        sun_ecl = ephem.Ecliptic(sun)
-        moon_ecl = ephem.Ecliptic(moon)
-        
-        # Ayanamsa (Lahiri) approximation for 2000-2050
-        # Ayanamsa ~ 23.85 + 0.0139 * (Year - 2000)
-        # More precise: 23deg 51min roughly for now.
-        # Using a simple linear model for recent times.
-        t_century = (ephem.julian_date(observer.date) - 2451545.0) / 36525.0
-        ayanamsa_deg = 23.85 + 1.4 * t_century # Rough approximation
-        # Better: use fixed value 24.2 for 2025.
-        ayanamsa_rad = math.radians(ayanamsa_deg)
-
-        # 1. Tithi (Independent of Ayanamsa)
-        # Difference between Moon and Sun longitudes
-        diff = (moon_ecl.lon - sun_ecl.lon) % (2 * math.pi)
-        tithi_num = math.ceil(math.degrees(diff) / 12.0)
-        
-        # Determine Paksha and Tithi Name
-        if tithi_num <= 15:
-            paksha = "Śukla Pakṣe"
-            tithi_name = TITHI_NAMES[tithi_num] if tithi_num < 15 else "Pūrṇimā"
-        else:
-            paksha = "Kṛṣṇa Pakṣe"
-            idx = tithi_num - 15
-            tithi_name = TITHI_NAMES[idx] if idx < 15 else "Amāvāsyā"
-            
-        # 2. Nakshatra (Needs Ayanamsa)
-        # Nirayana Longitude = Sayana - Ayanamsa
-        nirayana_moon = (moon_ecl.lon - ayanamsa_rad) % (2 * math.pi)
-        nakshatra_num = math.ceil(math.degrees(nirayana_moon) * 27 / 360.0)
-        if nakshatra_num == 0: nakshatra_num = 27
-        nakshatra_name = NAKSHATRA_NAMES[int(nakshatra_num) - 1]
-        
-        # 3. Masa (Lunar Month)
-        # Based on Solar Rashi (Nirayana Sun)
-        nirayana_sun = (sun_ecl.lon - ayanamsa_rad) % (2 * math.pi)
-        solar_rashi = int(math.degrees(nirayana_sun) / 30.0) # 0 = Mesha
-        
-        # Amanta Rule: Lunar Month = Solar Rashi + 1 (Index 0-11)
-        # If Solar Rashi is Dhanu (8), Month is Pausha (9)
-        masa_idx = (solar_rashi + 1) % 12
-        masa_name = MASA_NAMES[masa_idx]
+    key = location_date_key(latitude, longitude, timezone, year, month, day)
+    cached = _ephem_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    with stage_timer("ephemeris"):
+        result = _calculate_panchanga_local(latitude, longitude, timezone, year, month, day)
+    if result is not None:
+        _ephem_cache.set(key, result)
+        return dict(result)
+    return None
+
+async def get_accurate_panchanga_local_async(latitude, longitude, timezone, year, month, day):
+    """
+    Async version of get_accurate_panchanga_local.
+    Cache hits are served inline; misses are calculated on the CPU executor (see executor.py)
+    so the event loop stays free, and the result is memoized in this process.
+    """
+    key = location_date_key(latitude, longitude, timezone, year, month, day)
+    cached = _ephem_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    # Includes any wait for a free worker, which is part of what the caller sees
+    with stage_timer("ephemeris"):
+        result = await run_cpu(_calculate_panchanga_local, latitude, longitude, timezone, year, month, day)
+    if result is not None:
+        _ephem_cache.set(key, result)
+        return dict(result)
+    return None
+
+def get_transitions_local(latitude, longitude, timezone, year, month, day):
+    """
+    Start/end times of the Tithi, Nakshatra and Yoga in effect at sunrise (see
+    transitions.find_transitions), memoized like get_accurate_panchanga_local.
+
+    Returns:
+        dict: {"tithi"|"nakshatra"|"yoga": {"starts_at", "ends_at"}}, or None if the
+              calculation failed.
+    """
+    key = location_date_key(latitude, longitude, timezone, year, month, day)
+    cached = _transitions_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    with stage_timer("ephemeris"):
+        result = _calculate_transitions_local(latitude, longitude, timezone, year, month, day)
+    if result is not None:
+        _transitions_cache.set(key, result)
+        return copy.deepcopy(result)
+    return None
+
+async def get_transitions_local_async(latitude, longitude, timezone, year, month, day):
+    """Async version of get_transitions_local; misses are calculated on the CPU executor."""
+    key = location_date_key(latitude, longitude, timezone, year, month, day)
+    cached = _transitions_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    with stage_timer("ephemeris"):
+        result = await run_cpu(_calculate_transitions_local, latitude, longitude, timezone, year, month, day)
+    if result is not None:
+        _transitions_cache.set(key, result)
+        return copy.deepcopy(result)
+    return None
+
+def get_cache_stats():
+    """Returns hit/miss counters for the in-process caches."""
+    from ephemeris_snapshot import get_snapshot
+    from sunrise_grid import get_sunrise_grid
+
+    stats = {
+        "ephemeris": _ephem_cache.stats(),
+        "transitions": _transitions_cache.stats(),
+        "sunrise_grid": get_sunrise_grid().stats(),
+        "audio": get_audio_cache().stats(),
+        "shared": get_cache_backend().stats()
+    }
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        stats["ephemeris_snapshot"] = snapshot.stats()
+    return stats
+
+# Request coalescing: concurrent identical requests (e.g. every client asking for the same
+# city at midnight) share one upstream call, one transliteration and one TTS synthesis
+_panchanga_flight = SingleFlight("panchanga")
+_voice_text_flight = SingleFlight("voice_text")
+_audio_flight = SingleFlight("audio")
+
+def get_coalescing_stats():
+    """Returns call/coalesced counters for each request-coalescing stage."""
+    return {flight.name: flight.stats() for flight in (_panchanga_flight, _voice_text_flight, _audio_flight)}
+
+def tithi_name_and_paksha(tithi_num):
+    """Maps a tithi number from the elongation (0-30) to (tithi name, paksha)."""
+    if tithi_num <= 15:
+        paksha = "Śukla Pakṣe"
+        tithi_name = TITHI_NAMES[tithi_num] if tithi_num < 15 else "Pūrṇimā"
+    else:
+        paksha = "Kṛṣṇa Pakṣe"
+        idx = tithi_num - 15
+        tithi_name = TITHI_NAMES[idx] if idx < 15 else "Amāvāsyā"
+    return tithi_name, paksha
+
+def panchanga_indexes(julian_date, sun_lon, moon_lon):
+    """
+    Tithi/Nakshatra/Masa numbers from the Sun and Moon longitudes (radians) at sunrise.
+
+    Returns:
+        dict: "tithi" (0-30, from the elongation), "nakshatra" (1-27),
+              "solar_rashi" (0-11, 0 = Mesha) and "masa" (0-11, index into MASA_NAMES).
+    """
+    from ephemeris import ayanamsa_degrees
+
+    ayanamsa_rad = math.radians(ayanamsa_degrees(julian_date))
+
+    # 1. Tithi (Independent of Ayanamsa)
+    # Difference between Moon and Sun longitudes
+    diff = (moon_lon - sun_lon) % (2 * math.pi)
+    tithi_num = math.ceil(math.degrees(diff) / 12.0)
         
+    # 2. Nakshatra (Needs Ayanamsa)
+    # Nirayana Longitude = Sayana - Ayanamsa
+    nirayana_moon = (moon_lon - ayanamsa_rad) % (2 * math.pi)
+    nakshatra_num = math.ceil(math.degrees(nirayana_moon) * 27 / 360.0)
+    if nakshatra_num == 0: nakshatra_num = 27
+    
+    # 3. Masa (Lunar Month)
+    # Based on Solar Rashi (Nirayana Sun)
+    nirayana_sun = (sun_lon - ayanamsa_rad) % (2 * math.pi)
+    solar_rashi = int(math.degrees(nirayana_sun) / 30.0) # 0 = Mesha
+    
+    # Amanta Rule: Lunar Month = Solar Rashi + 1 (Index 0-11)
+    # If Solar Rashi is Dhanu (8), Month is Pausha (9)
+    masa_idx = (solar_rashi + 1) % 12
+
+    return {
+        "tithi": tithi_num,
+        "nakshatra": int(nakshatra_num),
+        "solar_rashi": solar_rashi,
+        "masa": masa_idx
+    }
+
+def _calculate_panchanga_local(latitude, longitude, timezone, year, month, day):
+    """
+    Uncached pyephem calculation behind get_accurate_panchanga_local.
+    """
+    # Imported on first use: pyephem and NumPy are most of this module's import time,
+    # and clients that never calculate locally (stdio sessions asking for text only,
+    # the upstream engine behind warm caches) should not pay for them at startup.
+    # Outside the try, so a configuration error (e.g. PANCHANGA_AYANAMSA) is raised
+    # rather than turned into a missing result.
+    from ephemeris import sunrise_ecliptic_longitudes
+
+    try:
+        jd, sun_lon, moon_lon, sunrise_status = sunrise_ecliptic_longitudes(latitude, longitude, timezone, year, month, day)
+        indexes = panchanga_indexes(jd, sun_lon, moon_lon)
+
+        tithi_name, paksha = tithi_name_and_paksha(indexes["tithi"])
+        nakshatra_name = NAKSHATRA_NAMES[indexes["nakshatra"] - 1]
+        masa_name = MASA_NAMES[indexes["masa"]]
+
         return {
             "tithi": tithi_name,
             "paksha": paksha,
             "nakshatra": nakshatra_name,
-            "masa": masa_name
+            "masa": masa_name,
+            # "ok", or "always_up"/"never_up" when the Sun does not rise that day and
+            # the elements are taken at local noon instead
+            "sunrise_status": sunrise_status
         }
     except Exception as e:
         print(f"Error in local calculation: {e}")
         return None
 
-def cleanup_old_audio_files(directory=".", pattern="sankalpam_*.mp3", max_age_seconds=86400):
+def _calculate_transitions_local(latitude, longitude, timezone, year, month, day):
     """
-    Deletes files matching the pattern that are older than max_age_seconds.
-    Default: 24 hours (86400 seconds).
+    Uncached calculation behind get_transitions_local.
     """
-    now = time.time()
-    for filepath in glob.glob(os.path.join(directory, pattern)):
-        try:
-            file_age = now - os.path.getmtime(filepath)
-            if file_age > max_age_seconds:
-                os.remove(filepath)
-        except Exception as e:
-            pass # Ignore errors during cleanup
+    # Imported on first use, like in _calculate_panchanga_local
+    from ephemeris import sunrise_ecliptic_longitudes
+    from transitions import find_transitions
 
-def get_panchanga(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
-    """
-    Get the Hindu Panchanga details for a specific location and date.
-    
-    Args:
-        latitude (float): Latitude of the location.
-        longitude (float): Longitude of the location.
-        timezone (float): Timezone offset from UTC (e.g., -6.0 for CST).
-        year (int, optional): Year (default: current year).
-        month (int, optional): Month (default: current month).
-        day (int, optional): Day (default: current day).
-        location_name (str, optional): Name of the location (default: "Unknown").
-        
-    Returns:
-        dict: A dictionary containing the Panchanga details.
-    """
-    # Use current date if not provided
+    try:
+        # The sunrise sample is cheap (sunrise grid); the solver is the expensive part
+        jd, _, _, _ = sunrise_ecliptic_longitudes(latitude, longitude, timezone, year, month, day)
+        return find_transitions(latitude, longitude, timezone, jd)
+    except Exception as e:
+        print(f"Failed to find transition times: {e}")
+        return None
+
+def resolve_date(year=None, month=None, day=None):
+    """Fills in missing date parts with today's date."""
     now = datetime.now()
     if year is None:
         year = now.year
@@ -164,11 +283,27 @@ def get_panchanga(latitude, longitude, timezone, year=None, month=None, day=None
         month = now.month
     if day is None:
         day = now.day
+    return year, month, day
 
-    # API Configuration
-    base_url = os.getenv("PANCHANGAM_API_URL", "http://localhost:8080/api/panchanga")
-    
-    params = {
+def _compute_local_engine(latitude, longitude, timezone, year, month, day, location_name, transitions=None, with_transitions=True):
+    """
+    Full Panchanga from local_engine (PANCHANGA_ENGINE=local), in the C# API's response shape.
+    """
+    # Imported here because local_engine builds on this module's helpers
+    from local_engine import compute_panchanga
+
+    try:
+        return compute_panchanga(
+            latitude, longitude, timezone, year, month, day, location_name, transitions, with_transitions
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        print(f"Error in local engine: {e}")
+        return {"error": f"Local engine failed: {e}"}
+
+def _upstream_params(latitude, longitude, timezone, year, month, day, location_name):
+    return {
         "year": year,
         "month": month,
         "day": day,
@@ -178,55 +313,148 @@ def get_panchanga(latitude, longitude, timezone, year=None, month=None, day=None
         "locationName": location_name
     }
 
+def _apply_accurate_overrides(data, latitude, longitude, timezone, year, month, day, include_transitions=True):
+    """
+    Overrides Tithi/Nakshatra/Masa in the upstream response with the local pyephem calculation.
+    This ensures /api/panchanga returns the same high-precision data as Sankalpam.
+    With include_transitions, also adds the exact starts_at/ends_at of Tithi and Nakshatra.
+    """
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        # Extract date from response or use input params
+        d_year = data.get('date', {}).get('year', year)
+        d_month = data.get('date', {}).get('month', month)
+        d_day = data.get('date', {}).get('day', day)
         
-        # Override with Accurate Local Calculation
-        # This ensures /api/panchanga returns the same high-precision data as Sankalpam
-        try:
-            # Extract date from response or use input params
-            d_year = data.get('date', {}).get('year', year)
-            d_month = data.get('date', {}).get('month', month)
-            d_day = data.get('date', {}).get('day', day)
-            
-            accurate_data = get_accurate_panchanga_local(latitude, longitude, timezone, d_year, d_month, d_day)
+        accurate_data = get_accurate_panchanga_local(latitude, longitude, timezone, d_year, d_month, d_day)
+        
+        if accurate_data:
+            # Override Tithi
+            if 'tithi' in data:
+                data['tithi']['name'] = accurate_data['tithi']
+                # Also update paksha in tithi name if possible or separate field? 
+                # The C# API structure might not have 'paksha' field at top level, often inside tithi or separate.
+                # We'll just update the name for now.
             
-            if accurate_data:
-                # Override Tithi
-                if 'tithi' in data:
-                    data['tithi']['name'] = accurate_data['tithi']
-                    # Also update paksha in tithi name if possible or separate field? 
-                    # The C# API structure might not have 'paksha' field at top level, often inside tithi or separate.
-                    # We'll just update the name for now.
+            # Override Nakshatra
+            if 'nakshatra' in data:
+                data['nakshatra']['name'] = accurate_data['nakshatra']
+
+            # Exact start/end times (ISO 8601, local time) from the transition solver
+            transitions = (get_transitions_local(latitude, longitude, timezone, d_year, d_month, d_day) if include_transitions else None) or {}
+            for element in ('tithi', 'nakshatra'):
+                if element in data and element in transitions:
+                    data[element]['starts_at'] = transitions[element]['starts_at']
+                    data[element]['ends_at'] = transitions[element]['ends_at']
                 
-                # Override Nakshatra
-                if 'nakshatra' in data:
-                    data['nakshatra']['name'] = accurate_data['nakshatra']
-                    
-                # Override Masa
-                if 'masa' in data:
-                    data['masa']['name'] = accurate_data['masa']
-                    
-                # Add a flag to indicate accurate calculation
-                data['calculation_method'] = "High Precision (pyephem)"
+            # Override Masa
+            if 'masa' in data:
+                data['masa']['name'] = accurate_data['masa']
                 
-        except Exception as e:
-            print(f"Failed to override with accurate data: {e}")
+            # Add a flag to indicate accurate calculation
+            data['calculation_method'] = "High Precision (pyephem)"
             
-        return data
+    except Exception as e:
+        print(f"Failed to override with accurate data: {e}")
+        
+    return data
+
+def get_panchanga(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown", include_transitions=True):
+    """
+    Get the Hindu Panchanga details for a specific location and date.
+    
+    Args:
+        latitude (float): Latitude of the location.
+        longitude (float): Longitude of the location.
+        timezone (float): Timezone offset from UTC (e.g., -6.0 for CST).
+        year (int, optional): Year (default: current year).
+        month (int, optional): Month (default: current month).
+        day (int, optional): Day (default: current day).
+        location_name (str, optional): Name of the location (default: "Unknown").
+        include_transitions (bool, optional): Add the element start/end times (default: True).
+            Their solver is most of a cold calculation; callers that only need the
+            names (the Sankalpam) pass False.
+        
+    Returns:
+        dict: A dictionary containing the Panchanga details.
+    """
+    year, month, day = resolve_date(year, month, day)
+
+    if PANCHANGA_ENGINE == "local":
+        with stage_timer("local_engine"):
+            # Already built from the local calculation; nothing to override
+            return _compute_local_engine(
+                latitude, longitude, timezone, year, month, day, location_name, with_transitions=include_transitions
+            )
+
+    params = _upstream_params(latitude, longitude, timezone, year, month, day, location_name)
 
-    except requests.exceptions.RequestException as e:
+    try:
+        with stage_timer("upstream"):
+            data = get_upstream_client().fetch_panchanga_sync(params)
+    except httpx.HTTPError as e:
         return {"error": str(e)}
 
-def get_sankalpam(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
+    return _apply_accurate_overrides(data, latitude, longitude, timezone, year, month, day, include_transitions)
+
+async def get_panchanga_async(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown", include_transitions=True):
     """
-    Generates a Sankalpam string for a specific location and date.
+    Async version of get_panchanga.
+    Uses the shared pooled upstream client so it does not block the event loop.
+    Concurrent calls for the same location, date and name share one computation.
+    """
+    year, month, day = resolve_date(year, month, day)
+    key = location_date_key(latitude, longitude, timezone, year, month, day) + (location_name, include_transitions)
+    return await _panchanga_flight.do(
+        key, lambda: _compute_panchanga_async(latitude, longitude, timezone, year, month, day, location_name, include_transitions)
+    )
+
+async def _local_calculations_async(latitude, longitude, timezone, year, month, day, include_transitions):
+    """(elements, transitions or None), calculated on the CPU executor in parallel on a miss."""
+    if not include_transitions:
+        return await get_accurate_panchanga_local_async(latitude, longitude, timezone, year, month, day), None
+    return await asyncio.gather(
+        get_accurate_panchanga_local_async(latitude, longitude, timezone, year, month, day),
+        get_transitions_local_async(latitude, longitude, timezone, year, month, day),
+    )
+
+async def _compute_panchanga_async(latitude, longitude, timezone, year, month, day, location_name, include_transitions=True):
+    if PANCHANGA_ENGINE == "local":
+        # Validate the date before handing it to the executor
+        try:
+            date(year, month, day)
+        except ValueError as e:
+            return {"error": str(e)}
+        # Also warms the element cache build_sankalpam reads
+        _, transitions = await _local_calculations_async(
+            latitude, longitude, timezone, year, month, day, include_transitions
+        )
+        with stage_timer("local_engine"):
+            # Transitions were already looked up (or not wanted), so the worker does not repeat it
+            return await run_cpu(
+                _compute_local_engine, latitude, longitude, timezone, year, month, day, location_name,
+                transitions, False
+            )
+
+    params = _upstream_params(latitude, longitude, timezone, year, month, day, location_name)
+
+    try:
+        with stage_timer("upstream"):
+            data = await get_upstream_client().fetch_panchanga(params)
+    except httpx.HTTPError as e:
+        return {"error": str(e)}
+
+    # Warm the ephemeris caches off the event loop; the overrides below then hit them
+    d = data.get('date') or {}
+    await _local_calculations_async(
+        latitude, longitude, timezone, d.get('year', year), d.get('month', month), d.get('day', day), include_transitions
+    )
+
+    return _apply_accurate_overrides(data, latitude, longitude, timezone, year, month, day, include_transitions)
+
+def build_sankalpam(data, latitude, longitude, timezone):
+    """
+    Builds the Sankalpam from Panchanga data returned by get_panchanga.
     """
-    # 1. Get Panchanga Data
-    data = get_panchanga(latitude, longitude, timezone, year, month, day, location_name)
-    
     if "error" in data:
         return f"Error fetching Panchanga data: {data['error']}"
 
@@ -267,11 +495,11 @@ def get_sankalpam(latitude, longitude, timezone, year=None, month=None, day=None
             tithi_normalized = unicodedata.normalize('NFD', tithi_full)
             
             if "ukla" in tithi_full or "Śukla" in tithi_full or "Sukla" in tithi_full or "ukla" in tithi_normalized:
-                paksha = "Śukla Pakṣe"
+                paksha = PAKSHA_NAMES[0]
             elif "ṛṣṇa" in tithi_full or "rishna" in tithi_full or "Krishna" in tithi_full:
-                paksha = "Kṛṣṇa Pakṣe"
+                paksha = PAKSHA_NAMES[1]
             else:
-                paksha = "Pakṣe" # Fallback
+                paksha = PAKSHA_NAMES[2] # Fallback
 
             # Clean Tithi name (remove paksha part if needed, but usually kept in Sankalpa)
             tithi_parts = tithi_full.split(' ')
@@ -285,91 +513,459 @@ def get_sankalpam(latitude, longitude, timezone, year=None, month=None, day=None
         # July 16 - Jan 14 -> Dakshinayana
         date_val = d_month * 100 + d_day
         if 115 <= date_val <= 715:
-            ayana = "Uttarāyaṇe"
+            ayana = UTTARAYANA
         else:
-            ayana = "Dakṣiṇāyane"
+            ayana = DAKSHINAYANA
 
         # 5. Construct Sankalpam
-        sankalpam = (
-            f"Śrī Śubha {samvatsara} Nāma Samvatsare, {ayana}, {ritu} Ṛtau, "
-            f"{masa} Māse, {paksha}, {tithi_name} Śubha Tithau, "
-            f"{vara} Vāsara Yuktāyām, {nakshatra} Nakṣatra Yuktāyām, "
-            f"Śubha Yoga Śubha Karaṇa Evaṃ Guṇa Viśeṣaṇa Viśiṣṭāyām, "
-            f"Asyāṃ Śubha Tithau..."
-        )
-        
+        components = {
+            "samvatsara": samvatsara,
+            "ayana": ayana,
+            "ritu": ritu,
+            "masa": masa,
+            "paksha": paksha,
+            "tithi": tithi_name,
+            "vara": vara,
+            "nakshatra": nakshatra
+        }
         return {
-            "sankalpam": sankalpam,
-            "components": {
-                "samvatsara": samvatsara,
-                "ayana": ayana,
-                "ritu": ritu,
-                "masa": masa,
-                "paksha": paksha,
-                "tithi": tithi_name,
-                "vara": vara,
-                "nakshatra": nakshatra
-            }
+            "sankalpam": SANKALPAM_TEMPLATE.format(**components),
+            "components": components
         }
 
     except KeyError as e:
         return {"error": f"Error parsing Panchanga data: Missing key {e}"}
 
-async def _generate_audio(text, output_file, voice="hi-IN-SwaraNeural"):
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(output_file)
+def get_sankalpam(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
+    """
+    Generates a Sankalpam string for a specific location and date.
+    """
+    # 1. Get Panchanga Data (names only; the Sankalpam has no start/end times)
+    data = get_panchanga(latitude, longitude, timezone, year, month, day, location_name, include_transitions=False)
+    return build_sankalpam(data, latitude, longitude, timezone)
+
+async def get_sankalpam_async(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
+    """
+    Async version of get_sankalpam.
+    """
+    data = await get_panchanga_async(latitude, longitude, timezone, year, month, day, location_name, include_transitions=False)
+    return build_sankalpam(data, latitude, longitude, timezone)
+
+# Date range (calendar) requests
+RANGE_MAX_DAYS = int(os.getenv("PANCHANGA_RANGE_MAX_DAYS", "366"))
+RANGE_CONCURRENCY = int(os.getenv("PANCHANGA_RANGE_CONCURRENCY", "8"))
+
+def _parse_date_range(start_date, end_date):
+    """
+    Parses YYYY-MM-DD strings (or date objects) and validates the range.
+
+    Raises:
+        ValueError: If a date is malformed, end is before start, or the range is too long.
+    """
+    start = start_date if isinstance(start_date, date) else date.fromisoformat(start_date)
+    end = end_date if isinstance(end_date, date) else date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError(f"end_date {end} is before start_date {start}")
+    num_days = (end - start).days + 1
+    if num_days > RANGE_MAX_DAYS:
+        raise ValueError(f"Date range of {num_days} days exceeds the limit of {RANGE_MAX_DAYS} days")
+    return start, end
+
+async def get_panchanga_range_async(latitude, longitude, timezone, start_date, end_date, location_name="Unknown"):
+    """
+    Get the Panchanga for every day from start_date to end_date (inclusive) in one call.
+
+    Upstream requests are issued concurrently over the pooled client (bounded by
+    PANCHANGA_RANGE_CONCURRENCY) and each day's ephemeris result is memoized.
+
+    Args:
+        timezone (float|str): UTC offset in hours, or an IANA name resolved for each day
+                              (so a range across a DST change uses the right offset).
+        start_date (str): First date, YYYY-MM-DD.
+        end_date (str): Last date, YYYY-MM-DD (at most PANCHANGA_RANGE_MAX_DAYS after start).
+
+    Returns:
+        dict: Range metadata and a "days" list with one get_panchanga result per date,
+              or {"error": ...} if the range is invalid.
+    """
+    try:
+        latitude, longitude, timezone, location_name = normalize_location(latitude, longitude, timezone, location_name)
+        start, end = _parse_date_range(start_date, end_date)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    semaphore = asyncio.Semaphore(RANGE_CONCURRENCY)
+
+    async def fetch_day(d):
+        day_timezone = utc_offset_hours(timezone, d.year, d.month, d.day)
+        async with semaphore:
+            return await get_panchanga_async(latitude, longitude, day_timezone, d.year, d.month, d.day, location_name)
+
+    days = await asyncio.gather(*(fetch_day(d) for d in dates))
+
+    return {
+        "location": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "timezone": timezone,
+            "name": location_name
+        },
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "days": days
+    }
+
+# Batch (many locations) requests
+BATCH_MAX_ITEMS = int(os.getenv("PANCHANGA_BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("PANCHANGA_BATCH_CONCURRENCY", "16"))
+
+def _parse_batch_item(item):
+    """
+    Validates and normalizes one batch item (see normalize.normalize_request).
+
+    Raises:
+        ValueError: If a field is missing or malformed.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    for field in ("latitude", "longitude", "timezone"):
+        if field not in item:
+            raise ValueError(f"Missing field {field}")
+
+    year = month = day = None
+    if item.get("date"):
+        d = date.fromisoformat(str(item["date"]))
+        year, month, day = d.year, d.month, d.day
+
+    return normalize_request(
+        item["latitude"], item["longitude"], item["timezone"], year, month, day, item.get("location_name")
+    )
+
+async def get_panchanga_batch_async(items, include_sankalpam=False, panchanga_fn=None):
+    """
+    Get the Panchanga for many (location, date) items in one call.
+
+    Items are fanned out concurrently (bounded by PANCHANGA_BATCH_CONCURRENCY); identical
+    items are computed once. Results come back in the order of the items, and a bad
+    item only fails its own entry.
+
+    Args:
+        items (list): Objects with "latitude", "longitude", "timezone" and optional
+                      "location_name" and "date" (YYYY-MM-DD, default: today).
+        include_sankalpam (bool, optional): Also build the Sankalpam for each item.
+        panchanga_fn (callable, optional): Async fetcher with get_panchanga_async's
+                      signature (default: get_panchanga_async).
+
+    Returns:
+        dict: "count" and a "results" list of {"panchanga", ["sankalpam"]} or {"error"}
+              per item, or {"error": ...} if the batch itself is invalid.
+    """
+    if not isinstance(items, list):
+        return {"error": "items must be a list"}
+    if len(items) > BATCH_MAX_ITEMS:
+        return {"error": f"Batch of {len(items)} items exceeds the limit of {BATCH_MAX_ITEMS} items"}
+
+    panchanga_fn = panchanga_fn or get_panchanga_async
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch_item(args):
+        latitude, longitude, timezone, year, month, day, location_name = args
+        async with semaphore:
+            data = await panchanga_fn(latitude, longitude, timezone, year, month, day, location_name)
+        if "error" in data:
+            return {"error": data["error"]}
+        result = {"panchanga": data}
+        if include_sankalpam:
+            # Precomputed-table hits skip get_panchanga_async, so make sure the
+            # ephemeris result build_sankalpam needs is cached without blocking the loop
+            await get_accurate_panchanga_local_async(latitude, longitude, timezone, year, month, day)
+            result["sankalpam"] = build_sankalpam(data, latitude, longitude, timezone)
+        return result
+
+    # Dedupe: one task per distinct (location, date, name)
+    tasks = {}
+    keys = []
+    for item in items:
+        try:
+            args = _parse_batch_item(item)
+        except ValueError as e:
+            keys.append({"error": str(e)})
+            continue
+        key = location_date_key(*args[:6]) + (args[6],)
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(fetch_item(args))
+        keys.append(key)
+
+    if tasks:
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results = []
+    for key in keys:
+        if isinstance(key, dict):
+            results.append(key)
+            continue
+        try:
+            results.append(tasks[key].result())
+        except Exception as e:
+            print(f"Batch item failed: {e}")
+            results.append({"error": str(e)})
+
+    return {"count": len(results), "unique": len(tasks), "results": results}
+
+# Edge TTS voice used for Sankalpam audio
+TTS_VOICE = "hi-IN-SwaraNeural"
+
+# Factory for TTS sessions: called as factory(text, voice) and must return an object with
+# edge_tts.Communicate's save(path) and stream() methods. Swappable (see set_tts_factory)
+# so benchmarks and load tests can run without network access.
+# None means edge_tts.Communicate, imported on first use: edge_tts (and aiohttp under it)
+# is the slowest import here and most requests never synthesize audio.
+_tts_factory = None
+
+def set_tts_factory(factory=None):
+    """Replaces the TTS backend; None restores edge_tts.Communicate."""
+    global _tts_factory
+    _tts_factory = factory
+
+def _get_tts_factory():
+    if _tts_factory is not None:
+        return _tts_factory
+    import edge_tts
+    return edge_tts.Communicate
+
+# Max concurrent Edge TTS sessions per process
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+_tts_semaphores = {}
+
+def _get_tts_semaphore():
+    # asyncio primitives are bound to one event loop; scripts may run several loops
+    loop = asyncio.get_running_loop()
+    semaphore = _tts_semaphores.get(loop)
+    if semaphore is None:
+        _tts_semaphores.clear()
+        semaphore = _tts_semaphores[loop] = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+    return semaphore
+
+async def _generate_audio(text, output_file, voice=TTS_VOICE):
+    async with _get_tts_semaphore():
+        with stage_timer("tts"):
+            communicate = _get_tts_factory()(text, voice)
+            await communicate.save(output_file)
+
+async def _synthesize_to_cache(text, voice=TTS_VOICE):
+    """
+    Returns (audio_file, cached) for text, synthesizing with Edge TTS only on a cache miss.
+
+    Raises:
+        Exception: If audio generation fails.
+    """
+    # Files are keyed by a hash of (Devanagari text, voice), so the same Sankalpam
+    # for the same city and day is generated once.
+    audio_cache = get_audio_cache()
+    output_file = audio_cache.get(text, voice)
+    if output_file is not None:
+        return output_file, True
+
+    # Concurrent requests for the same text (here or streaming) share one synthesis
+    return await _audio_flight.do((text, voice), lambda: _synthesize_shared(text, voice))
+
+async def _synthesize_shared(text, voice):
+    audio_cache = get_audio_cache()
+
+    # Then the shared cache, where another replica may already have synthesized it;
+    # only one replica synthesizes a given text at a time
+    synthesized = False
+
+    async def synthesize():
+        nonlocal synthesized
+        temp_file = audio_cache.temp_path()
+        try:
+            await _generate_audio(text, temp_file, voice)
+            synthesized = True
+            return audio_cache.commit(temp_file, text, voice)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def read_file(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    output_file = await get_or_compute(
+        get_cache_backend(), "audio:" + audio_cache.key(text, voice), synthesize,
+        encode=read_file, decode=lambda blob: audio_cache.put_bytes(blob, text, voice)
+    )
+    return output_file, not synthesized
+
+async def join_audio_in_flight(text, voice=TTS_VOICE):
+    """
+    Waits for a synthesis of (text, voice) that is already running in this process.
+
+    Returns:
+        str: The cached file path, or None if none is running or it failed.
+    """
+    try:
+        joined = await _audio_flight.join((text, voice))
+    except Exception:
+        return None
+    return joined[0] if joined else None
+
+async def fetch_shared_audio(text, voice=TTS_VOICE):
+    """
+    Copies audio for (text, voice) from the shared cache into the local audio cache.
+
+    Returns:
+        str: The local file path, or None if no replica has synthesized it yet.
+    """
+    audio_cache = get_audio_cache()
+    blob = await get_cache_backend().get(shared_key("audio:" + audio_cache.key(text, voice)))
+    if blob is None:
+        return None
+    return audio_cache.put_bytes(blob, text, voice)
+
+def _to_devanagari(result):
+    """
+    Adds the Devanagari form of a get_sankalpam result for TTS.
+    Edge TTS (Hindi voices) reads Devanagari much better than IAST.
+    """
+    if isinstance(result, str): # Error case (legacy string return)
+        return {"error": result}
+    if "error" in result:
+        return result
+
+    # Imported here because transliteration builds on this module's name lists
+    from transliteration import get_devanagari_table
+
+    sankalpam_iast = result["sankalpam"]
+    try:
+        # Assembled from precomputed Devanagari fragments and names; the same
+        # components always give byte-identical text (and so the same audio cache key)
+        sankalpam_devanagari = get_devanagari_table().render(result["components"])
+    except Exception as e:
+        return {"error": f"Transliteration failed: {str(e)}"}
+
+    return {
+        "sankalpam_text": sankalpam_iast,
+        "sankalpam_devanagari": sankalpam_devanagari
+    }
+
+async def get_sankalpam_voice_text_async(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown", sankalpam_fn=None):
+    """
+    Returns the Sankalpam in IAST and Devanagari, ready for speech synthesis.
+
+    Args:
+        sankalpam_fn (callable, optional): Async fetcher with get_sankalpam_async's
+            signature, e.g. mcp_tools.lookup_or_get_sankalpam to serve the text from the
+            precomputed table and shared cache. Defaults to get_sankalpam_async.
+    """
+    year, month, day = resolve_date(year, month, day)
+    key = location_date_key(latitude, longitude, timezone, year, month, day) + (location_name,)
+    return await _voice_text_flight.do(
+        key, lambda: _compute_voice_text_async(latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn)
+    )
+
+async def _compute_voice_text_async(latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn=None):
+    sankalpam_fn = sankalpam_fn or get_sankalpam_async
+    result = await sankalpam_fn(latitude, longitude, timezone, year, month, day, location_name)
+    # String assembly (microseconds) once the table exists; not worth an executor hop
+    with stage_timer("transliteration"):
+        return _to_devanagari(result)
+
+async def stream_sankalpam_audio(text, voice=TTS_VOICE):
+    """
+    Streams MP3 chunks from Edge TTS as they arrive.
+
+    The audio is also written to a temp file and committed to the audio cache (and the
+    shared cache) once the stream completes, so later requests for the same text are
+    served from disk.
+    An interrupted stream (e.g. client disconnect) leaves nothing in the cache.
+
+    While it runs, the stream counts as the in-flight synthesis of text, so concurrent
+    requests for the same audio wait for it (see join_audio_in_flight) instead of
+    starting another TTS session.
+    """
+    audio_cache = get_audio_cache()
+    temp_file = audio_cache.temp_path()
+    completed = False
+    flight = _audio_flight.claim((text, voice))
+    path = None
+    try:
+        async with _get_tts_semaphore():
+            with stage_timer("tts"), open(temp_file, "wb") as f:
+                communicate = _get_tts_factory()(text, voice)
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        f.write(chunk["data"])
+                        yield chunk["data"]
+        completed = True
+        path = audio_cache.commit(temp_file, text, voice)
+        with open(path, "rb") as f:
+            await get_cache_backend().set(shared_key("audio:" + audio_cache.key(text, voice)), f.read())
+    finally:
+        if not completed and os.path.exists(temp_file):
+            os.remove(temp_file)
+        if flight is not None:
+            if path is not None:
+                _audio_flight.settle((text, voice), flight, (path, False))
+            else:
+                _audio_flight.settle((text, voice), flight, error=RuntimeError("Audio stream interrupted"))
 
 def get_sankalpam_voice(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown"):
     """
     Generates a Sankalpam audio file for a specific location and date.
+    Blocking; from async code (FastAPI routes, MCP tools) await get_sankalpam_voice_async instead.
     
     Returns:
         dict: Contains the path to the generated audio file and the text.
     """
-    # 0. Cleanup old files
-    cleanup_old_audio_files()
-
     # 1. Get Sankalpam Text
     result = get_sankalpam(latitude, longitude, timezone, year, month, day, location_name)
     
-    if isinstance(result, str): # Error case (legacy string return)
-         return {"error": result}
-    if "error" in result:
-        return result
-        
-    sankalpam_iast = result["sankalpam"]
-    
     # 2. Transliterate IAST to Devanagari
-    # Edge TTS (Hindi voices) reads Devanagari much better than IAST
+    with stage_timer("transliteration"):
+        text = _to_devanagari(result)
+    if "error" in text:
+        return text
+
+    # 3. Serve from the audio cache, synthesizing only on a miss
     try:
-        sankalpam_devanagari = sanscript.transliterate(sankalpam_iast, sanscript.IAST, sanscript.DEVANAGARI)
+        output_file, cached = asyncio.run(_synthesize_to_cache(text["sankalpam_devanagari"]))
     except Exception as e:
-        return {"error": f"Transliteration failed: {str(e)}"}
+        return {"error": f"Audio generation failed: {str(e)}"}
+        
+    return {"audio_file": output_file, "cached": cached, **text}
 
-    # 3. Generate Audio with Unique Filename
-    # Sanitize location name
-    safe_location = re.sub(r'[^a-zA-Z0-9]', '_', location_name)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"sankalpam_{safe_location}_{timestamp}.mp3"
+async def get_sankalpam_voice_async(latitude, longitude, timezone, year=None, month=None, day=None, location_name="Unknown", sankalpam_fn=None):
+    """
+    Async version of get_sankalpam_voice.
+    Concurrent requests overlap; Edge TTS sessions are bounded by TTS_MAX_CONCURRENCY.
+    sankalpam_fn is passed to get_sankalpam_voice_text_async.
+    """
+    text = await get_sankalpam_voice_text_async(latitude, longitude, timezone, year, month, day, location_name, sankalpam_fn)
+    if "error" in text:
+        return text
 
     try:
-        asyncio.run(_generate_audio(sankalpam_devanagari, output_file))
+        output_file, cached = await _synthesize_to_cache(text["sankalpam_devanagari"])
     except Exception as e:
         return {"error": f"Audio generation failed: {str(e)}"}
-        
-    return {
-        "audio_file": output_file,
-        "sankalpam_text": sankalpam_iast,
-        "sankalpam_devanagari": sankalpam_devanagari
-    }
+
+    return {"audio_file": output_file, "cached": cached, **text}
 
 if __name__ == "__main__":
-    # Test the function with Frisco, TX coordinates
+    # Test the function with Frisco, TX coordinates (CST or CDT, whichever is in force today)
+    latitude, longitude, timezone, year, month, day, location_name = normalize_request(
+        33.1507, -96.8236, "America/Chicago", location_name="Frisco, TX"
+    )
     print("\n--- Sankalpam Voice ---")
     voice_result = get_sankalpam_voice(
-        latitude=33.1507, 
-        longitude=-96.8236, 
-        timezone=-6.0, 
-        location_name="Frisco, TX"
+        latitude=latitude, 
+        longitude=longitude, 
+        timezone=timezone, 
+        year=year,
+        month=month,
+        day=day,
+        location_name=location_name
     )
     print(json.dumps(voice_result, indent=2, ensure_ascii=False))
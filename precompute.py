@@ -0,0 +1,202 @@
+import os
+import json
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from panchanga_tool import get_panchanga_async, build_sankalpam, location_date_key
+from normalize import quantize_coordinate, parse_timezone, utc_offset_hours, tzinfo_for
+
+
+class PrecomputedTable:
+    """
+    Read-mostly table of precomputed Panchanga and Sankalpam results.
+
+    Entries are stored as compact JSON bytes keyed by (kind, location/date key), so a
+    lookup is a dictionary read plus a parse that hands each caller its own copy.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, latitude, longitude, timezone, year, month, day):
+        key = (kind,) + location_date_key(latitude, longitude, timezone, year, month, day)
+        blob = self._entries.get(key)
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(blob)
+
+    def contains(self, kind, latitude, longitude, timezone, year, month, day):
+        return (kind,) + location_date_key(latitude, longitude, timezone, year, month, day) in self._entries
+
+    def put(self, kind, latitude, longitude, timezone, year, month, day, value):
+        key = (kind,) + location_date_key(latitude, longitude, timezone, year, month, day)
+        blob = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._entries[key] = blob
+
+    def prune(self, before):
+        """Drops entries for dates before the given date."""
+        cutoff = (before.year, before.month, before.day)
+        with self._lock:
+            for key in [k for k in self._entries if k[-3:] < cutoff]:
+                del self._entries[key]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": sum(len(blob) for blob in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def load_locations(path=None):
+    """
+    Loads the locations to precompute.
+
+    Reads a JSON list of {"name", "latitude", "longitude", "timezone"} objects from
+    path (or PANCHANGA_PRECOMPUTE_LOCATIONS); defaults to validate_locations.LOCATIONS.
+    "timezone" is an offset in hours or an IANA name (resolved per date, following DST).
+    """
+    path = path or os.getenv("PANCHANGA_PRECOMPUTE_LOCATIONS")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            locations = [
+                (item.get("name", "Unknown"), item["latitude"], item["longitude"], item["timezone"])
+                for item in json.load(f)
+            ]
+    else:
+        from validate_locations import LOCATIONS
+        locations = LOCATIONS
+
+    # Normalized like requests (normalize.py), so lookups find the entries
+    return [
+        (name, quantize_coordinate(latitude, 90, "latitude"), quantize_coordinate(longitude, 180, "longitude"), parse_timezone(timezone))
+        for name, latitude, longitude, timezone in locations
+    ]
+
+
+class PrecomputeScheduler:
+    """
+    Background task that keeps the PrecomputedTable filled for the configured locations.
+
+    On start it fills the next `days` local dates for every location. After that it sleeps
+    until `lead_minutes` before the next local midnight among the configured timezones and
+    precomputes the upcoming days for the locations in that timezone, so the table is warm
+    before the new day's traffic arrives.
+
+    Configuration (environment):
+        PANCHANGA_PRECOMPUTE_DAYS: Number of local dates to keep ready, starting today (default: 2).
+        PANCHANGA_PRECOMPUTE_LEAD_MINUTES: How long before local midnight to run (default: 15).
+        PANCHANGA_PRECOMPUTE_CONCURRENCY: Parallel upstream fetches while filling (default: 4).
+    """
+
+    def __init__(self, table, locations, days=None, lead_minutes=None, concurrency=None):
+        self.table = table
+        self.locations = locations
+        self.days = days or int(os.getenv("PANCHANGA_PRECOMPUTE_DAYS", "2"))
+        self.lead = timedelta(minutes=lead_minutes or float(os.getenv("PANCHANGA_PRECOMPUTE_LEAD_MINUTES", "15")))
+        self.concurrency = concurrency or int(os.getenv("PANCHANGA_PRECOMPUTE_CONCURRENCY", "4"))
+        self.last_run = None
+        self.errors = 0
+
+    @staticmethod
+    def _local_now(timezone, now_utc):
+        return now_utc.replace(tzinfo=dt_timezone.utc).astimezone(tzinfo_for(timezone)).replace(tzinfo=None)
+
+    @staticmethod
+    def _to_utc(local_time, timezone):
+        return local_time.replace(tzinfo=tzinfo_for(timezone)).astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+    async def _fill(self, location, local_date, semaphore):
+        name, latitude, longitude, timezone = location
+        y, m, d = local_date.year, local_date.month, local_date.day
+        # Keyed by the offset on that date, as normalize_request resolves it for lookups
+        tz_hours = utc_offset_hours(timezone, y, m, d)
+        if self.table.contains("sankalpam", latitude, longitude, tz_hours, y, m, d):
+            return
+
+        async with semaphore:
+            data = await get_panchanga_async(latitude, longitude, tz_hours, y, m, d, name)
+        if "error" in data:
+            self.errors += 1
+            print(f"Precompute failed for {name} {local_date}: {data['error']}")
+            return
+
+        # build_sankalpam does not modify data, so both results share one upstream fetch
+        sankalpam = build_sankalpam(data, latitude, longitude, tz_hours)
+        self.table.put("panchanga", latitude, longitude, tz_hours, y, m, d, data)
+        if isinstance(sankalpam, dict) and "error" not in sankalpam:
+            self.table.put("sankalpam", latitude, longitude, tz_hours, y, m, d, sankalpam)
+
+    async def refresh(self, locations, now_utc=None, start_offset=0):
+        """Fills `days` local dates per location, starting start_offset days after local today."""
+        now_utc = now_utc or datetime.now(dt_timezone.utc).replace(tzinfo=None)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Requests without an explicit date resolve to the location's local date
+        jobs = []
+        for location in locations:
+            local_today = self._local_now(location[3], now_utc).date()
+            dates = [local_today + timedelta(days=offset) for offset in range(start_offset, start_offset + self.days)]
+            for local_date in dates:
+                jobs.append(self._fill(location, local_date, semaphore))
+        await asyncio.gather(*jobs)
+
+        # Keep a day of slack for timezones behind UTC
+        self.table.prune(now_utc.date() - timedelta(days=2))
+        self.last_run = datetime.now(dt_timezone.utc).isoformat()
+
+    def _next_run(self, now_utc):
+        """Returns (wake_time_utc, timezone) for the next pre-midnight run."""
+        best = None
+        for timezone in {location[3] for location in self.locations}:
+            local_now = self._local_now(timezone, now_utc)
+            next_midnight = datetime.combine(local_now.date() + timedelta(days=1), datetime.min.time())
+            wake_utc = self._to_utc(next_midnight, timezone) - self.lead
+            if wake_utc <= now_utc:
+                # Already inside the lead window for this timezone; wait for the next one
+                wake_utc += timedelta(days=1)
+            if best is None or wake_utc < best[0]:
+                best = (wake_utc, timezone)
+        return best
+
+    async def run(self):
+        due, start_offset = self.locations, 0
+        while True:
+            try:
+                await self.refresh(due, start_offset=start_offset)
+            except Exception as e:
+                self.errors += 1
+                print(f"Precompute run failed: {e}")
+
+            now_utc = datetime.now(dt_timezone.utc).replace(tzinfo=None)
+            wake_utc, timezone = self._next_run(now_utc)
+            await asyncio.sleep(max(0.0, (wake_utc - now_utc).total_seconds()))
+            # Local "today" is still the old day when we wake, so start from tomorrow
+            due = [location for location in self.locations if location[3] == timezone]
+            start_offset = 1
+
+    def stats(self):
+        return {
+            "locations": len(self.locations),
+            "days": self.days,
+            "last_run": self.last_run,
+            "errors": self.errors,
+            **self.table.stats(),
+        }
+
+
+_table = PrecomputedTable()
+
+
+def get_precomputed_table():
+    """Returns the process-wide PrecomputedTable."""
+    return _table
@@ -1,6 +1,7 @@
-from mcp_server import mcp
+from mcp_tools import mcp
 
 if __name__ == "__main__":
     # Run the MCP server using standard input/output
     # This is used for local integration with Claude Desktop, Cursor, etc.
+    # mcp_tools has only the MCP tools; the HTTP server (mcp_server) is never imported here
     mcp.run(transport='stdio')
@@ -0,0 +1,120 @@
+import copy
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls within the process.
+
+    The first caller for a key runs the computation; callers arriving while it is in
+    flight await the same result instead of starting their own. Nothing is kept once
+    the call finishes (caching is the job of the caches behind it), so a later call
+    computes again.
+
+    Followers receive a deep copy of the result, so a caller that mutates its result
+    (e.g. setting the location name) cannot affect the others.
+
+    Args:
+        name (str): Label reported in stats().
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._loop = None
+        self._futures = {}
+
+    def _get_futures(self):
+        # Futures are bound to one event loop; scripts may run several loops in turn
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._futures = {}
+        return self._futures
+
+    def pending(self, key):
+        """Returns the future of the call in flight for key, or None."""
+        return self._get_futures().get(key)
+
+    def claim(self, key):
+        """
+        Registers the caller as the one computing key.
+
+        Returns:
+            asyncio.Future: The future to settle() when done, or None if key is
+            already in flight (await pending(key) instead).
+        """
+        futures = self._get_futures()
+        if key in futures:
+            return None
+        self.calls += 1
+        future = futures[key] = self._loop.create_future()
+        return future
+
+    async def join(self, key):
+        """
+        Awaits the call in flight for key (from do() or claim()), counted as a coalesced call.
+
+        Returns:
+            A copy of the call's result, or None if nothing is in flight for key.
+
+        Raises:
+            Exception: Whatever the call in flight failed with.
+        """
+        pending = self.pending(key)
+        if pending is None:
+            return None
+        self.calls += 1
+        self.coalesced += 1
+        return copy.deepcopy(await asyncio.shield(pending))
+
+    def settle(self, key, future, result=None, error=None):
+        """Resolves a claimed future and releases the key."""
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+                # Joined callers re-raise it; with none waiting, nothing else retrieves it
+                future.exception()
+            else:
+                future.set_result(result)
+        self._release(key, future)
+
+    async def do(self, key, compute):
+        """
+        Returns compute()'s result, sharing it with concurrent callers for key.
+
+        The computation runs as its own task, so a caller being cancelled (e.g. its
+        client disconnected) does not cancel it for the others.
+
+        Args:
+            key: Hashable identity of the call.
+            compute: Coroutine function taking no arguments.
+
+        Raises:
+            Exception: Whatever compute raised, for every caller sharing it.
+        """
+        self.calls += 1
+        futures = self._get_futures()
+        pending = futures.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(pending))
+
+        task = futures[key] = asyncio.ensure_future(compute())
+        task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task)
+
+    def _release(self, key, future):
+        if self._futures.get(key) is future:
+            del self._futures[key]
+        # Mark the exception retrieved; if every caller was cancelled nobody else would
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._futures),
+        }
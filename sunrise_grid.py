@@ -0,0 +1,201 @@
+import os
+import math
+import threading
+
+import ephem
+
+from cache import TTLCache
+
+# Sunrise/sunset from a latitude x day grid instead of pyephem's iterative search.
+#
+# For every grid latitude and day the grid stores the local mean time (LMT) of sunrise
+# and sunset at longitude 0. Any other location is served by bicubic interpolation in
+# latitude and day, where the day is shifted by -longitude/360: an observer at longitude
+# L sees sunrise when the Sun is in the state Greenwich sees it L/360 of a day later.
+# The LMT result is then converted to UT with the same longitude offset.
+#
+# Grid rows are built lazily in blocks of BLOCK_DAYS days per latitude (~7 ms each) and
+# kept in an LRU cache. Within GRID_MAX_LAT the result is within 0.1 s of
+# observer.next_rising/next_setting. Beyond it (and wherever a neighbouring grid point
+# has no event), the exact pyephem search is used.
+
+GRID_ENABLED = os.getenv("PANCHANGA_SUNRISE_GRID", "true").lower() in ("1", "true", "yes")
+GRID_STEP = float(os.getenv("PANCHANGA_SUNRISE_GRID_STEP", "0.5"))        # degrees of latitude
+GRID_MAX_LAT = float(os.getenv("PANCHANGA_SUNRISE_GRID_MAX_LAT", "62"))   # |latitude| served from the grid
+GRID_MAX_BLOCKS = int(os.getenv("PANCHANGA_SUNRISE_GRID_BLOCKS", "8192"))  # ~1.6 KB each
+BLOCK_DAYS = 32
+
+# Why an event has no time
+SUNRISE_OK = "ok"
+ALWAYS_UP = "always_up"    # polar day: the Sun does not set
+NEVER_UP = "never_up"      # polar night: the Sun does not rise
+
+
+def exact_event(latitude, longitude, after, setting=False):
+    """
+    Next sunrise (or sunset) after `after` from pyephem's search.
+
+    Returns:
+        tuple: (ephem.Date or None, status), status one of SUNRISE_OK, ALWAYS_UP, NEVER_UP.
+    """
+    observer = ephem.Observer()
+    observer.lat = str(latitude)
+    observer.lon = str(longitude)
+    observer.date = after
+    try:
+        if setting:
+            return observer.next_setting(ephem.Sun()), SUNRISE_OK
+        return observer.next_rising(ephem.Sun()), SUNRISE_OK
+    except ephem.AlwaysUpError:
+        return None, ALWAYS_UP
+    except ephem.NeverUpError:
+        return None, NEVER_UP
+
+
+def _lagrange_weights(t):
+    # 4-point Lagrange weights for samples at -1, 0, 1, 2
+    return (
+        -t * (t - 1) * (t - 2) / 6,
+        (t + 1) * (t - 1) * (t - 2) / 2,
+        -(t + 1) * t * (t - 2) / 2,
+        (t + 1) * t * (t - 1) / 6,
+    )
+
+
+class SunriseGrid:
+    """
+    Lazily built latitude x day grid of sunrise/sunset times at longitude 0.
+
+    Days are numbered like ephem dates: day k starts at UT midnight, ephem.Date(k - 0.5).
+
+    Args:
+        step (float): Latitude spacing in degrees.
+        max_lat (float): Largest |latitude| served from the grid.
+        max_blocks (int): Grid blocks kept in memory (LRU).
+    """
+
+    def __init__(self, step=GRID_STEP, max_lat=GRID_MAX_LAT, max_blocks=GRID_MAX_BLOCKS):
+        self.step = step
+        self.max_lat = max_lat
+        self._blocks = TTLCache(maxsize=max_blocks, ttl=float("inf"))
+        self.hits = 0
+        self.misses = 0
+
+    def _build_block(self, row, block):
+        """LMT hours of [sunrise, ...], [sunset, ...] at row's latitude for the block's days."""
+        observer = ephem.Observer()
+        observer.lat = str(row * self.step)
+        observer.lon = "0"
+        sun = ephem.Sun()
+        rises, sets = [], []
+        # One padding day before and two after, for the cubic at the block's edges
+        for day in range(block * BLOCK_DAYS - 1, block * BLOCK_DAYS + BLOCK_DAYS + 2):
+            midnight = day - 0.5
+            for start, search, values in (
+                (midnight - 0.25, observer.next_rising, rises),   # from 18:00 the day before
+                (midnight + 0.5, observer.next_setting, sets),    # from noon
+            ):
+                observer.date = start
+                try:
+                    values.append((search(sun) - midnight) * 24.0)
+                except (ephem.AlwaysUpError, ephem.NeverUpError):
+                    values.append(math.nan)
+        return rises, sets
+
+    def _block(self, row, block):
+        key = (row, block)
+        values = self._blocks.get(key)
+        if values is None:
+            values = self._build_block(row, block)
+            self._blocks.set(key, values)
+        return values
+
+    def next_event(self, latitude, longitude, after, setting=False):
+        """
+        Next sunrise (or sunset) after `after` (ephem date, UT).
+
+        Returns:
+            tuple: (ephem.Date or None, status) as exact_event, which it falls back to
+            near the poles.
+        """
+        if abs(latitude) <= self.max_lat:
+            shift = longitude / 360.0
+            row = math.floor(latitude / self.step)
+            row_weights = _lagrange_weights(latitude / self.step - row)
+            kind = 1 if setting else 0
+            rows = None
+            rows_block = None
+
+            # Events fall between local-mean-time midnights, so the event of the LMT day
+            # containing `after` or of the next day is the one we want
+            first = math.floor(after + shift + 0.5)
+            for day in (first, first + 1):
+                # Bicubic interpolation at the shifted (fractional) day
+                position = day - shift
+                grid_day = math.floor(position)
+                block = grid_day // BLOCK_DAYS
+                if block != rows_block:
+                    rows = [self._block(r, block)[kind] for r in range(row - 1, row + 3)]
+                    rows_block = block
+                offset = grid_day - (block * BLOCK_DAYS - 1) - 1
+                day_weights = _lagrange_weights(position - grid_day)
+
+                hours = 0.0
+                for values, row_weight in zip(rows, row_weights):
+                    hours += row_weight * (
+                        day_weights[0] * values[offset] + day_weights[1] * values[offset + 1]
+                        + day_weights[2] * values[offset + 2] + day_weights[3] * values[offset + 3]
+                    )
+                # NaN: some grid point has no event (near the polar circles); search exactly
+                if math.isnan(hours):
+                    break
+                when = day - 0.5 + hours / 24.0 - shift
+                if when >= after:
+                    self.hits += 1
+                    return ephem.Date(when), SUNRISE_OK
+        self.misses += 1
+        return exact_event(latitude, longitude, after, setting)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "blocks": len(self._blocks),
+            "max_blocks": self._blocks.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def get_sunrise_grid():
+    """Returns the process-wide SunriseGrid."""
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                _grid = SunriseGrid()
+    return _grid
+
+
+def next_sunrise(latitude, longitude, after):
+    """
+    Next sunrise after `after` (ephem date, UT).
+
+    Returns:
+        tuple: (ephem.Date or None, status); None with ALWAYS_UP or NEVER_UP when the Sun
+        does not rise (polar day or night).
+    """
+    if GRID_ENABLED:
+        return get_sunrise_grid().next_event(latitude, longitude, after)
+    return exact_event(latitude, longitude, after)
+
+
+def next_sunset(latitude, longitude, after):
+    """Next sunset after `after`; same return value as next_sunrise."""
+    if GRID_ENABLED:
+        return get_sunrise_grid().next_event(latitude, longitude, after, setting=True)
+    return exact_event(latitude, longitude, after, setting=True)
@@ -0,0 +1,173 @@
+import math
+from datetime import timezone as dt_timezone
+
+from ephemeris import make_observer, julian_to_ephem_date, ecliptic_longitudes, ayanamsa_degrees
+from normalize import tzinfo_for
+
+# Angular width of one element
+TITHI_SPAN = 12.0            # degrees of Moon-Sun elongation
+NAKSHATRA_SPAN = 360.0 / 27  # 13°20′ of sidereal Moon longitude
+YOGA_SPAN = 360.0 / 27       # 13°20′ of sidereal Sun + Moon longitude
+
+# Bounds on how fast each angle advances (degrees/day), used to bracket crossings.
+# The Moon's geocentric motion ranges over roughly 11.8-15.4 degrees/day; the bounds
+# are deliberately loose and the bracket is still verified before solving.
+TITHI_RATE_RANGE = (8.0, 18.0)
+NAKSHATRA_RATE_RANGE = (9.0, 19.0)
+YOGA_RATE_RANGE = (10.0, 20.0)  # Moon plus the Sun's ~1 degree/day
+
+# Root-finding tolerance: one second, in days
+TOLERANCE_DAYS = 1.0 / 86400.0
+MAX_ITERATIONS = 60
+
+
+def _wrap180(angle):
+    """Wraps an angle in degrees to (-180, 180]."""
+    angle = math.fmod(angle, 360.0)
+    if angle <= -180.0:
+        angle += 360.0
+    elif angle > 180.0:
+        angle -= 360.0
+    return angle
+
+
+def angles_at(observer, julian_date):
+    """Returns (elongation, nirayana Moon longitude, nirayana Sun longitude) in degrees at a Julian date."""
+    observer.date = julian_to_ephem_date(julian_date)
+    sun_lon, moon_lon = ecliptic_longitudes(observer)
+    ayanamsa = ayanamsa_degrees(julian_date)
+    elongation = math.degrees(moon_lon - sun_lon) % 360.0
+    nirayana_moon = (math.degrees(moon_lon) - ayanamsa) % 360.0
+    nirayana_sun = (math.degrees(sun_lon) - ayanamsa) % 360.0
+    return elongation, nirayana_moon, nirayana_sun
+
+
+def solve_crossing(angle_fn, boundary, lo, hi):
+    """
+    Finds the instant in [lo, hi] where angle_fn crosses boundary.
+
+    Uses the signed angular distance to the boundary, which increases through zero at
+    the crossing, and solves it with the Illinois variant of regula falsi (falls back to
+    bisection steps if the interpolation stalls).
+    """
+    f_lo = _wrap180(angle_fn(lo) - boundary)
+    f_hi = _wrap180(angle_fn(hi) - boundary)
+    if f_lo > 0 or f_hi < 0:
+        raise ValueError("Crossing is not bracketed")
+
+    side = 0
+    for _ in range(MAX_ITERATIONS):
+        if hi - lo <= TOLERANCE_DAYS:
+            break
+        if f_hi != f_lo:
+            mid = hi - f_hi * (hi - lo) / (f_hi - f_lo)
+        else:
+            mid = (lo + hi) / 2
+        if not lo < mid < hi:
+            mid = (lo + hi) / 2
+
+        f_mid = _wrap180(angle_fn(mid) - boundary)
+        if f_mid < 0:
+            lo, f_lo = mid, f_mid
+            if side == -1:
+                f_hi /= 2
+            side = -1
+        else:
+            hi, f_hi = mid, f_mid
+            if side == 1:
+                f_lo /= 2
+            side = 1
+
+    return (lo + hi) / 2
+
+
+def bracket_crossing(angle_fn, julian_date, current, boundary, rate_range, forward):
+    """
+    Brackets the crossing of boundary using the element's min/max rate of motion,
+    widening the bracket if the rate bounds turn out not to hold.
+    """
+    min_rate, max_rate = rate_range
+    margin = 0.05  # days
+    if forward:
+        distance = (boundary - current) % 360.0
+        lo = max(julian_date, julian_date + distance / max_rate - margin)
+        hi = julian_date + distance / min_rate
+    else:
+        distance = (current - boundary) % 360.0
+        lo = julian_date - distance / min_rate
+        hi = min(julian_date, julian_date - distance / max_rate + margin)
+
+    for _ in range(10):
+        if _wrap180(angle_fn(lo) - boundary) <= 0 <= _wrap180(angle_fn(hi) - boundary):
+            return lo, hi
+        if forward:
+            hi += 0.25
+        else:
+            lo -= 0.25
+    raise ValueError("Could not bracket crossing")
+
+
+def _element_bounds(angle_fn, julian_date, current, span, rate_range):
+    """Returns (start_jd, end_jd) of the element that contains julian_date."""
+    index = math.floor(current / span)
+    start_boundary = (index * span) % 360.0
+    end_boundary = ((index + 1) * span) % 360.0
+
+    lo, hi = bracket_crossing(angle_fn, julian_date, current, start_boundary, rate_range, forward=False)
+    start = solve_crossing(angle_fn, start_boundary, lo, hi)
+    lo, hi = bracket_crossing(angle_fn, julian_date, current, end_boundary, rate_range, forward=True)
+    end = solve_crossing(angle_fn, end_boundary, lo, hi)
+    return start, end
+
+
+def julian_to_local_iso(julian_date, timezone):
+    """Formats a Julian date as an ISO 8601 local time with the UTC offset (hours or IANA name)."""
+    utc = julian_to_ephem_date(julian_date).datetime().replace(tzinfo=dt_timezone.utc)
+    local = utc.astimezone(tzinfo_for(timezone))
+    return local.replace(microsecond=0).isoformat()
+
+
+def find_transitions(latitude, longitude, timezone, julian_date):
+    """
+    Finds when the Tithi, Nakshatra and Yoga in effect at julian_date (usually sunrise) start and end.
+
+    Uses the same Sun/Moon positions as get_accurate_panchanga_local, so the sampled
+    element always lies between its starts_at and ends_at.
+
+    Returns:
+        dict: {"tithi": {"starts_at", "ends_at"}, "nakshatra": {...}, "yoga": {...}}
+              with ISO 8601 local times.
+    """
+    observer = make_observer(latitude, longitude)
+    elongation, nirayana_moon, nirayana_sun = angles_at(observer, julian_date)
+
+    def elongation_at(jd):
+        return angles_at(observer, jd)[0]
+
+    def nirayana_moon_at(jd):
+        return angles_at(observer, jd)[1]
+
+    def yoga_sum_at(jd):
+        _, moon, sun = angles_at(observer, jd)
+        return (moon + sun) % 360.0
+
+    tithi_start, tithi_end = _element_bounds(elongation_at, julian_date, elongation, TITHI_SPAN, TITHI_RATE_RANGE)
+    nak_start, nak_end = _element_bounds(nirayana_moon_at, julian_date, nirayana_moon, NAKSHATRA_SPAN, NAKSHATRA_RATE_RANGE)
+    yoga_start, yoga_end = _element_bounds(
+        yoga_sum_at, julian_date, (nirayana_moon + nirayana_sun) % 360.0, YOGA_SPAN, YOGA_RATE_RANGE
+    )
+
+    return {
+        "tithi": {
+            "starts_at": julian_to_local_iso(tithi_start, timezone),
+            "ends_at": julian_to_local_iso(tithi_end, timezone),
+        },
+        "nakshatra": {
+            "starts_at": julian_to_local_iso(nak_start, timezone),
+            "ends_at": julian_to_local_iso(nak_end, timezone),
+        },
+        "yoga": {
+            "starts_at": julian_to_local_iso(yoga_start, timezone),
+            "ends_at": julian_to_local_iso(yoga_end, timezone),
+        },
+    }
@@ -0,0 +1,105 @@
+import json
+import string
+import threading
+
+from panchanga_tool import (
+    SANKALPAM_TEMPLATE, UTTARAYANA, DAKSHINAYANA, PAKSHA_NAMES, TITHI_NAMES, NAKSHATRA_NAMES, MASA_NAMES
+)
+from local_engine import SANSKRIT_NAMES_PATH
+
+# Cap on words transliterated on demand (names outside the known vocabulary, e.g. from
+# a newer upstream); the vocabulary itself is a few hundred entries
+MAX_EXTRA_WORDS = 1024
+
+
+def _transliterate(text):
+    # Imported here: the transliteration library is slow to import and only needed
+    # while the table is built or for an unknown word
+    from indic_transliteration import sanscript
+    return sanscript.transliterate(text, sanscript.IAST, sanscript.DEVANAGARI)
+
+
+def sankalpam_vocabulary(names_path=SANSKRIT_NAMES_PATH):
+    """
+    Every IAST word or phrase that can fill a Sankalpam template slot.
+
+    Collected from sanskrit-names.json (the names the C# API returns) and the name
+    lists in panchanga_tool (the local ephemeris overrides).
+    """
+    words = set(TITHI_NAMES) | set(NAKSHATRA_NAMES) | set(MASA_NAMES) | set(PAKSHA_NAMES)
+    words |= {UTTARAYANA, DAKSHINAYANA, "Pūrṇimā", "Amāvāsyā"}
+    try:
+        with open(names_path, "r", encoding="utf-8") as f:
+            for category in json.load(f).values():
+                words.update(category.values())
+    except (OSError, ValueError) as e:
+        print(f"Could not load Sanskrit names from {names_path}: {e}")
+    return words
+
+
+class DevanagariTable:
+    """
+    Devanagari forms of the Sankalpam template and its vocabulary, computed once.
+
+    render() then builds the Devanagari Sankalpam by string assembly instead of running
+    the transliterator over the whole sentence. The template is split at its
+    placeholders and every fixed fragment starts and ends at a space or punctuation,
+    so the result is identical to transliterating the assembled IAST text.
+
+    Args:
+        template (str): str.format template with one placeholder per component.
+        words (iterable): IAST values the placeholders can take.
+    """
+
+    def __init__(self, template=SANKALPAM_TEMPLATE, words=None):
+        self.words = {word: _transliterate(word) for word in (words if words is not None else sankalpam_vocabulary())}
+        # [(Devanagari literal, component name or None)] in template order
+        self.fragments = [
+            (_transliterate(literal) if literal else "", field)
+            for literal, field, _, _ in string.Formatter().parse(template)
+        ]
+        self.known = len(self.words)
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def word(self, iast):
+        """Devanagari for one component value, transliterating (and keeping) unknown ones."""
+        devanagari = self.words.get(iast)
+        if devanagari is None:
+            devanagari = _transliterate(iast)
+            with self._lock:
+                self.fallbacks += 1
+                if len(self.words) < self.known + MAX_EXTRA_WORDS:
+                    self.words[iast] = devanagari
+        return devanagari
+
+    def render(self, components):
+        """
+        The Devanagari Sankalpam for build_sankalpam's "components".
+
+        Raises:
+            KeyError: If a template component is missing.
+        """
+        parts = []
+        for literal, field in self.fragments:
+            parts.append(literal)
+            if field:
+                parts.append(self.word(components[field]))
+        return "".join(parts)
+
+    def stats(self):
+        return {"words": len(self.words), "known": self.known, "fallbacks": self.fallbacks}
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_devanagari_table():
+    """Returns the process-wide DevanagariTable (built on first use, ~0.2 s)."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = DevanagariTable()
+    return _table
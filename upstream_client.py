@@ -0,0 +1,187 @@
+import os
+import time
+import asyncio
+import httpx
+
+from metrics import UPSTREAM_ERRORS
+
+# Upstream C# Panchanga API (PanchangaController)
+DEFAULT_API_URL = "http://localhost:8080/api/panchanga"
+
+# Status codes worth retrying (upstream busy / restarting)
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+def _decode_json(response):
+    """
+    Parses a successful response's JSON body.
+
+    Raises:
+        httpx.DecodingError: If the body is not JSON (a proxy's HTML error page, an empty
+                             or truncated body), so callers handling httpx.HTTPError cover it.
+    """
+    try:
+        return response.json()
+    except ValueError as e:
+        UPSTREAM_ERRORS.inc("decode")
+        raise httpx.DecodingError(f"Invalid JSON from upstream: {e}", request=response.request)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class UpstreamClient:
+    """
+    Pooled HTTP client for the Panchanga API.
+
+    Keeps one keep-alive connection pool for async callers (FastAPI routes, MCP tools)
+    and one for sync callers (scripts like validate_locations.py), with timeouts and
+    retry with exponential backoff on connection errors and 429/5xx responses.
+
+    Configuration (environment):
+        PANCHANGAM_API_URL: Upstream endpoint (default: http://localhost:8080/api/panchanga).
+        PANCHANGAM_API_POOL_SIZE: Max pooled connections (default: 20).
+        PANCHANGAM_API_TIMEOUT: Read/write timeout in seconds (default: 10).
+        PANCHANGAM_API_CONNECT_TIMEOUT: Connect timeout in seconds (default: 3).
+        PANCHANGAM_API_RETRIES: Retries after the first attempt (default: 2).
+        PANCHANGAM_API_RETRY_BACKOFF: Base backoff in seconds, doubled per retry (default: 0.2).
+    """
+
+    def __init__(self, base_url=None, pool_size=None, timeout=None, connect_timeout=None, retries=None, backoff=None):
+        self.base_url = base_url or os.getenv("PANCHANGAM_API_URL", DEFAULT_API_URL)
+        self.pool_size = pool_size or _env_int("PANCHANGAM_API_POOL_SIZE", 20)
+        self.timeout = timeout or _env_float("PANCHANGAM_API_TIMEOUT", 10.0)
+        self.connect_timeout = connect_timeout or _env_float("PANCHANGAM_API_CONNECT_TIMEOUT", 3.0)
+        self.retries = retries if retries is not None else _env_int("PANCHANGAM_API_RETRIES", 2)
+        self.backoff = backoff if backoff is not None else _env_float("PANCHANGAM_API_RETRY_BACKOFF", 0.2)
+
+        self._async_client = None
+        self._async_loop = None
+        self._sync_client = None
+
+    def _client_options(self):
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        }
+
+    async def _get_async_client(self):
+        # An AsyncClient is bound to the event loop it was first used on.
+        # Scripts may call asyncio.run() more than once, so recreate it per loop.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            stale, stale_loop = self._async_client, self._async_loop
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            self._async_loop = loop
+            if stale is not None:
+                await self._close_stale_client(stale, stale_loop)
+        return self._async_client
+
+    @staticmethod
+    async def _close_stale_client(client, loop):
+        """
+        Closes the pool of a client left over from another event loop.
+
+        Its connections can only be shut down on their own loop: once that loop has
+        closed (asyncio.run returned), they are dropped with the client instead, which is
+        why one-shot scripts should await aclose() before their loop ends.
+        """
+        if loop is not None and loop.is_closed():
+            return
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            print(f"Failed to close stale upstream client: {e}")
+
+    def _get_sync_client(self):
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+
+    def _should_retry(self, attempt, response=None):
+        if attempt >= self.retries:
+            return False
+        return response is None or response.status_code in RETRY_STATUS_CODES
+
+    async def fetch_panchanga(self, params):
+        """
+        Fetch Panchanga JSON from the upstream API (async).
+
+        Raises:
+            httpx.HTTPError: If the request still fails after all retries, or the body
+                             is not JSON (httpx.DecodingError).
+        """
+        client = await self._get_async_client()
+        attempt = 0
+        while True:
+            try:
+                response = await client.get(self.base_url, params=params)
+            except httpx.TransportError:
+                UPSTREAM_ERRORS.inc("transport")
+                if not self._should_retry(attempt):
+                    raise
+            else:
+                if response.status_code >= 400:
+                    UPSTREAM_ERRORS.inc(response.status_code)
+                if not self._should_retry(attempt, response):
+                    response.raise_for_status()
+                    return _decode_json(response)
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    def fetch_panchanga_sync(self, params):
+        """
+        Fetch Panchanga JSON from the upstream API (blocking).
+
+        Raises:
+            httpx.HTTPError: If the request still fails after all retries, or the body
+                             is not JSON (httpx.DecodingError).
+        """
+        client = self._get_sync_client()
+        attempt = 0
+        while True:
+            try:
+                response = client.get(self.base_url, params=params)
+            except httpx.TransportError:
+                UPSTREAM_ERRORS.inc("transport")
+                if not self._should_retry(attempt):
+                    raise
+            else:
+                if response.status_code >= 400:
+                    UPSTREAM_ERRORS.inc(response.status_code)
+                if not self._should_retry(attempt, response):
+                    response.raise_for_status()
+                    return _decode_json(response)
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+_client = None
+
+
+def get_upstream_client():
+    """Returns the process-wide UpstreamClient (created on first use)."""
+    global _client
+    if _client is None:
+        _client = UpstreamClient()
+    return _client
@@ -1,31 +1,37 @@
 import json
+import asyncio
 from datetime import datetime
-from panchanga_tool import get_sankalpam
+from panchanga_tool import get_sankalpam, get_panchanga_batch_async
+from normalize import utc_offset_hours
+from upstream_client import get_upstream_client
 
 # Configuration
 DATE_STR = "2025-12-23"  # Testing for Dec 23, 2025
 YEAR, MONTH, DAY = 2025, 12, 23
 
 # Locations: Name, Lat, Lon, Timezone
+# IANA names, not fixed offsets: precompute.py seeds its table from this list and resolves
+# the offset per date, so entries match requests on both sides of a DST change
 LOCATIONS = [
-    ("Frisco, TX", 33.1507, -96.8236, -6.0),
-    ("New York, NY", 40.7128, -74.0060, -5.0),
-    ("London, UK", 51.5074, -0.1278, 0.0),
-    ("Mumbai, India", 19.0760, 72.8777, 5.5),
-    ("Sydney, Australia", -33.8688, 151.2093, 11.0),
-    ("Tokyo, Japan", 35.6762, 139.6503, 9.0),
-    ("Dubai, UAE", 25.2048, 55.2708, 4.0),
-    ("San Francisco, CA", 37.7749, -122.4194, -8.0),
-    ("Singapore", 1.3521, 103.8198, 8.0),
-    ("Berlin, Germany", 52.5200, 13.4050, 1.0)
+    ("Frisco, TX", 33.1507, -96.8236, "America/Chicago"),
+    ("New York, NY", 40.7128, -74.0060, "America/New_York"),
+    ("London, UK", 51.5074, -0.1278, "Europe/London"),
+    ("Mumbai, India", 19.0760, 72.8777, "Asia/Kolkata"),
+    ("Sydney, Australia", -33.8688, 151.2093, "Australia/Sydney"),
+    ("Tokyo, Japan", 35.6762, 139.6503, "Asia/Tokyo"),
+    ("Dubai, UAE", 25.2048, 55.2708, "Asia/Dubai"),
+    ("San Francisco, CA", 37.7749, -122.4194, "America/Los_Angeles"),
+    ("Singapore", 1.3521, 103.8198, "Asia/Singapore"),
+    ("Berlin, Germany", 52.5200, 13.4050, "Europe/Berlin")
 ]
 
-def test_location(name, lat, lon, tz):
+def test_location(name, lat, lon, tz, result=None):
     print(f"\nTesting {name}...")
     
     try:
-        # Call the tool function directly
-        result = get_sankalpam(lat, lon, tz, YEAR, MONTH, DAY, name)
+        # Call the tool function directly (unless the result was already fetched in a batch)
+        if result is None:
+            result = get_sankalpam(lat, lon, utc_offset_hours(tz, YEAR, MONTH, DAY), YEAR, MONTH, DAY, name)
         
         if isinstance(result, dict) and "sankalpam" in result:
             text = result["sankalpam"]
@@ -59,9 +65,23 @@ def test_location(name, lat, lon, tz):
 
 if __name__ == "__main__":
     print(f"Starting validation for date: {DATE_STR}")
+    # Fetch every location in one concurrent batch
+    items = [
+        {"latitude": lat, "longitude": lon, "timezone": tz, "location_name": name, "date": DATE_STR}
+        for name, lat, lon, tz in LOCATIONS
+    ]
+    async def fetch_batch():
+        try:
+            return await get_panchanga_batch_async(items, include_sankalpam=True)
+        finally:
+            # Close the pooled connections while their event loop is still running
+            await get_upstream_client().aclose()
+
+    batch = asyncio.run(fetch_batch())
+
     results = {}
-    for loc in LOCATIONS:
-        res = test_location(*loc)
+    for loc, entry in zip(LOCATIONS, batch["results"]):
+        res = test_location(*loc, result=entry.get("sankalpam", entry))
         if res:
             results[loc[0]] = res
             